@@ -0,0 +1,81 @@
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .models import Comment, Post
+
+
+def seed_rows(count):
+    """
+    Create `count` users, posts and comments to benchmark against.
+
+    Callers run this inside a transaction they roll back.
+    """
+    users = User.objects.bulk_create(
+        User(
+            username=f"bench-user-{i}",
+            email=f"bench{i}@example.com",
+            first_name="Bench",
+            last_name=f"User {i}",
+        )
+        for i in range(count)
+    )
+    posts = Post.objects.bulk_create(
+        Post(
+            title=f"Benchmark post {i}",
+            content="Lorem ipsum " * 20,
+            author=users[i % len(users)],
+            published=i % 3 != 0,
+        )
+        for i in range(count)
+    )
+    Comment.objects.bulk_create(
+        Comment(
+            content="Benchmark comment",
+            post=posts[i % len(posts)],
+            author=users[(i * 7) % len(users)],
+        )
+        for i in range(count)
+    )
+
+
+def best_of(repeat, func):
+    """Fastest of `repeat` timed calls of `func()`, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_per_call(iterations, func, arg):
+    """Mean seconds per call of `func(arg)` over `iterations` calls"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(arg)
+    return (time.perf_counter() - start) / iterations
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_commit():
+    """The checked-out commit, recorded in reports so runs can be compared"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
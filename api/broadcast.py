@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import math
+import time
+import uuid
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class GroupBroadcaster:
+    """
+    Produces one message per interval and fans it out to a channel-layer group.
+
+    Consumers call `subscribe` on connect and `unsubscribe` on disconnect. A
+    process runs its producer task only while it has subscribers. Across the
+    cluster a lease in the default cache elects a single leader, so the cost
+    of `produce` does not grow with the number of connections or processes.
+    If the leader stops, another producer takes over when the lease expires.
+    While `paused` is set, subscribing does not start the producer.
+    """
+
+    def __init__(self, group, message_type, produce, interval_setting):
+        self.group = group
+        self.message_type = message_type
+        self.produce = produce
+        self.interval_setting = interval_setting
+        self.lease_key = f"broadcast:{group}:leader"
+        self.token = uuid.uuid4().hex
+        self._subscribers = 0
+        self._task = None
+        self.paused = False
+
+    @property
+    def interval(self):
+        return getattr(settings, self.interval_setting)
+
+    async def subscribe(self):
+        self._subscribers += 1
+        if self.paused:
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() != loop:
+            self._task = loop.create_task(self._run())
+
+    async def unsubscribe(self):
+        self._subscribers = max(self._subscribers - 1, 0)
+        if self._subscribers == 0 and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            await self._release_lease()
+
+    async def _run(self):
+        channel_layer = get_channel_layer()
+        while True:
+            # Subscribers get the current data on connect, so wait first
+            interval = self.interval
+            await asyncio.sleep(interval)
+            try:
+                if await self._hold_lease(interval):
+                    data = await self.produce()
+                    # sent_at lets consumers measure delivery lag
+                    await channel_layer.group_send(
+                        self.group,
+                        {
+                            "type": self.message_type,
+                            "data": data,
+                            "sent_at": time.time(),
+                        },
+                    )
+            except Exception:
+                logger.exception("Broadcast to group %r failed", self.group)
+
+    async def _hold_lease(self, interval):
+        # Outlives a couple of missed ticks before another process takes over
+        timeout = max(1, math.ceil(interval * 3))
+        if await cache.aadd(self.lease_key, self.token, timeout):
+            return True
+        if await cache.aget(self.lease_key) == self.token:
+            await cache.atouch(self.lease_key, timeout)
+            return True
+        return False
+
+    async def _release_lease(self):
+        try:
+            if await cache.aget(self.lease_key) == self.token:
+                await cache.adelete(self.lease_key)
+        except Exception:
+            logger.exception("Releasing the %r broadcast lease failed", self.group)
@@ -0,0 +1,288 @@
+import math
+import pickle
+import random
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.redis import RedisCache
+from prometheus_client import Counter
+
+# Exported with the other application metrics on /prometheus/
+CACHE_HITS = Counter("cache_hits_total", "Two-tier cache hits", ["tier"])
+CACHE_MISSES = Counter("cache_misses_total", "Two-tier cache misses")
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total", "Entries evicted from the in-process cache tier"
+)
+CACHE_EARLY_REFRESHES = Counter(
+    "cache_early_refreshes_total", "Entries recomputed before they expired"
+)
+
+# Deletes a `fetch` lock only while it still holds the caller's token
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class LocalLRU:
+    """Thread-safe LRU of pickled values bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires_at, pickled = self._data[key]
+            except KeyError:
+                return None
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if timeout <= 0 or len(pickled) > self.max_bytes:
+            self.delete(key)
+            return
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.monotonic() + timeout, pickled)
+            self._bytes += len(pickled)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+                CACHE_EVICTIONS.inc()
+
+    def delete(self, key):
+        with self._lock:
+            return self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _pop(self, key):
+        item = self._data.pop(key, None)
+        if item is None:
+            return False
+        self._bytes -= len(item[1])
+        return True
+
+
+# One in-process tier per LOCATION, shared by all threads like LocMemCache
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    A bounded in-process LRU in front of another configured cache.
+
+    ``OPTIONS``:
+
+    - ``REMOTE``: alias of the shared cache (e.g. Redis) behind the LRU
+    - ``LOCAL_TIMEOUT``: seconds an entry may be served from process memory
+    - ``LOCAL_MAX_ENTRIES`` / ``LOCAL_MAX_BYTES``: LRU bounds
+    - ``LOCK_TIMEOUT``: how long `fetch` waits on another worker's recompute
+    - ``BETA``: eagerness of probabilistic early refresh (1.0 is standard)
+
+    Deletes only reach the local tier of the current process, so other
+    processes may serve a deleted entry for up to ``LOCAL_TIMEOUT`` seconds.
+    It suits immutable, versioned keys best. `fetch` adds single-flight
+    recomputation and early refresh on top of the usual cache API.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.remote_alias = options.get("REMOTE", "default")
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self.lock_timeout = options.get("LOCK_TIMEOUT", 10)
+        self.lock_poll_interval = options.get("LOCK_POLL_INTERVAL", 0.05)
+        self.beta = options.get("BETA", 1.0)
+        with _local_stores_lock:
+            if location not in _local_stores:
+                _local_stores[location] = LocalLRU(
+                    options.get("LOCAL_MAX_ENTRIES", 1000),
+                    options.get("LOCAL_MAX_BYTES", 32 * 1024 * 1024),
+                )
+            self.local = _local_stores[location]
+
+    @property
+    def remote(self):
+        return caches[self.remote_alias]
+
+    def _resolve_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _envelope(self, value, timeout, delta=0.0):
+        # The remote entry remembers its expiry and recompute cost for `fetch`
+        expires_at = None if timeout is None else time.time() + timeout
+        return (value, delta, expires_at)
+
+    def _store_local(self, local_key, envelope):
+        timeout = self.local_timeout
+        expires_at = envelope[2]
+        if expires_at is not None:
+            timeout = min(timeout, expires_at - time.time())
+        self.local.set(local_key, envelope, timeout)
+
+    def _get_envelope(self, key, version):
+        local_key = self.make_and_validate_key(key, version)
+        envelope = self.local.get(local_key)
+        if envelope is not None:
+            CACHE_HITS.labels(tier="local").inc()
+            return envelope
+        envelope = self.remote.get(key, version=version)
+        if envelope is None:
+            CACHE_MISSES.inc()
+            return None
+        CACHE_HITS.labels(tier="remote").inc()
+        self._store_local(local_key, envelope)
+        return envelope
+
+    def _set_envelope(self, key, envelope, timeout, version):
+        self.remote.set(key, envelope, timeout, version=version)
+        self._store_local(self.make_and_validate_key(key, version), envelope)
+
+    def get(self, key, default=None, version=None):
+        envelope = self._get_envelope(key, version)
+        return default if envelope is None else envelope[0]
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._resolve_timeout(timeout)
+        self._set_envelope(key, self._envelope(value, timeout), timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._resolve_timeout(timeout)
+        envelope = self._envelope(value, timeout)
+        if not self.remote.add(key, envelope, timeout, version=version):
+            return False
+        self._store_local(self.make_and_validate_key(key, version), envelope)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        # The stored expiry would go stale; drop the entry locally and extend it
+        self.local.delete(self.make_and_validate_key(key, version))
+        return self.remote.touch(key, self._resolve_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_and_validate_key(key, version))
+        return self.remote.delete(key, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.remote.clear()
+
+    def fetch(self, key, compute, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Return the cached value for `key`, calling `compute()` to fill it.
+
+        Only one caller across all workers recomputes a missing key; the others
+        wait for its result. Entries are refreshed early with a probability that
+        grows as they near expiry, weighted by how long `compute` took (the
+        XFetch algorithm), so hot keys rarely expire under load. A `compute()`
+        result of None is returned but not cached.
+        """
+        timeout = self._resolve_timeout(timeout)
+        envelope = self._get_envelope(key, version)
+        if envelope is not None:
+            value, delta, expires_at = envelope
+            if not self._should_refresh(delta, expires_at):
+                return value
+            CACHE_EARLY_REFRESHES.inc()
+
+        lock_key = f"{key}:lock"
+        token = self._acquire_lock(lock_key, version)
+        if token is not None:
+            try:
+                return self._recompute(key, compute, timeout, version)
+            finally:
+                self._release_lock(lock_key, token, version)
+        if envelope is not None:
+            # Another worker is already refreshing; the current value is valid
+            return envelope[0]
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll_interval)
+            envelope = self.remote.get(key, version=version)
+            if envelope is not None:
+                return envelope[0]
+            if not self.remote.has_key(lock_key, version=version):
+                # The holder finished without caching anything
+                break
+        return self._recompute(key, compute, timeout, version)
+
+    def _redis_client(self, lock_key, version):
+        """
+        The raw redis-py client and full key of `lock_key`, or None.
+
+        Django's RedisCache has no public client accessor; ``_cache`` and its
+        ``get_client(key, write=True)`` were checked against Django 5.2.
+        """
+        remote = self.remote
+        if not isinstance(remote, RedisCache):
+            return None
+        key = remote.make_and_validate_key(lock_key, version=version)
+        return remote._cache.get_client(key, write=True), key
+
+    def _acquire_lock(self, lock_key, version):
+        """Take the recompute lock of a key, returning its token or None"""
+        token = secrets.token_hex(16)
+        redis = self._redis_client(lock_key, version)
+        if redis is not None:
+            # SET NX PX with the raw token, for RELEASE_LOCK_SCRIPT to compare
+            client, key = redis
+            px = max(1, int(self.lock_timeout * 1000))
+            return token if client.set(key, token, nx=True, px=px) else None
+        if self.remote.add(lock_key, token, self.lock_timeout, version=version):
+            return token
+        return None
+
+    def _release_lock(self, lock_key, token, version):
+        """
+        Release a lock taken by `_acquire_lock`, unless it expired meanwhile.
+
+        A recompute may outlast ``LOCK_TIMEOUT``, after which another caller
+        can hold the lock; only the holder's token may delete it.
+        """
+        redis = self._redis_client(lock_key, version)
+        if redis is not None:
+            client, key = redis
+            client.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+        elif self.remote.get(lock_key, version=version) == token:
+            # Not atomic, but other backends lack a compare-and-delete
+            self.remote.delete(lock_key, version=version)
+
+    def _should_refresh(self, delta, expires_at):
+        if expires_at is None or delta <= 0:
+            return False
+        # -log(u) for u in (0, 1] is an exponentially distributed head start
+        head_start = -delta * self.beta * math.log(1.0 - random.random())
+        return time.time() + head_start >= expires_at
+
+    def _recompute(self, key, compute, timeout, version):
+        start = time.perf_counter()
+        value = compute()
+        if value is not None:
+            delta = time.perf_counter() - start
+            envelope = self._envelope(value, timeout, delta)
+            self._set_envelope(key, envelope, timeout, version)
+        return value
@@ -1,137 +1,240 @@
-import asyncio
 import json
 import socket
+import time
 from datetime import datetime
+from urllib.parse import parse_qs
 
-import psutil
 from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from django.db import connection
-
+from prometheus_client import Counter, Gauge, Histogram
+
+from .broadcast import GroupBroadcaster
+from .health import get_status_data
+from .renderers import packb
+from .system_metrics import system_metrics
+
+# Exported on /prometheus/ with the HTTP metrics; labelled by consumer route
+WS_CONNECTIONS = Gauge(
+    "websocket_connections",
+    "Open WebSocket connections",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+WS_CONNECTS = Counter(
+    "websocket_connects_total", "Accepted WebSocket connections", ["route"]
+)
+WS_DISCONNECTS = Counter(
+    "websocket_disconnects_total", "Closed WebSocket connections", ["route"]
+)
+WS_SEND_DURATION = Histogram(
+    "websocket_send_duration_seconds",
+    "Time to hand one frame to the server",
+    ["route"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5),
+)
+WS_SENT_BYTES = Counter(
+    "websocket_sent_bytes_total", "WebSocket frame payload bytes sent", ["route"]
+)
+WS_DELIVERY_LAG = Histogram(
+    "websocket_delivery_lag_seconds",
+    "Time from group_send to the consumer handling the event",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+WS_QUEUE_DEPTH = Histogram(
+    "websocket_queue_depth",
+    "Events still queued for a connection when it handles one",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+
+
+class ConsumerMetricsMixin:
+    """
+    Exports connection, send and delivery metrics of a WebSocket consumer.
+
+    ``metrics_route`` labels the consumer's metrics. Events carrying a
+    ``sent_at`` timestamp (see `GroupBroadcaster`) report their delivery lag
+    and how many events were still queued for the connection behind them.
+    Goes before the consumer base class.
+    """
+
+    metrics_route = None
+
+    async def accept(self, subprotocol=None, headers=None):
+        await super().accept(subprotocol=subprotocol, headers=headers)
+        self._route = route = self.metrics_route or type(self).__name__
+        self._send_duration = WS_SEND_DURATION.labels(route)
+        self._sent_bytes = WS_SENT_BYTES.labels(route)
+        self._delivery_lag = WS_DELIVERY_LAG.labels(route)
+        self._queue_depth = WS_QUEUE_DEPTH.labels(route)
+        self._open_connections = WS_CONNECTIONS.labels(route)
+        self._open_connections.inc()
+        WS_CONNECTS.labels(route).inc()
+
+    async def websocket_disconnect(self, message):
+        try:
+            await super().websocket_disconnect(message)
+        finally:
+            if getattr(self, "_open_connections", None) is not None:
+                self._open_connections.dec()
+                self._open_connections = None
+                WS_DISCONNECTS.labels(self._route).inc()
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        start = time.perf_counter()
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+        if getattr(self, "_open_connections", None) is None:
+            return
+        self._send_duration.observe(time.perf_counter() - start)
+        if bytes_data is not None:
+            self._sent_bytes.inc(len(bytes_data))
+        elif text_data.isascii():
+            self._sent_bytes.inc(len(text_data))
+        else:
+            self._sent_bytes.inc(len(text_data.encode()))
+
+    async def dispatch(self, message):
+        sent_at = message.get("sent_at")
+        if sent_at is not None and getattr(self, "_open_connections", None) is not None:
+            # Wall clocks of different hosts; skew shows up as lag
+            self._delivery_lag.observe(max(time.time() - sent_at, 0.0))
+            self._queue_depth.observe(self.pending_events())
+        await super().dispatch(message)
+
+    def pending_events(self):
+        """Events buffered for this connection in the channel layer"""
+        # Redis layers buffer per process-local channel, the in-memory layer
+        # keeps one queue per channel
+        buffers = getattr(self.channel_layer, "receive_buffer", None)
+        if buffers is None:
+            buffers = getattr(self.channel_layer, "channels", {})
+        queue = buffers.get(self.channel_name)
+        return queue.qsize() if queue is not None else 0
+
+
+class FrameEncodingMixin:
+    """
+    Lets a client choose MessagePack (binary) frames instead of JSON text.
+
+    Clients opt in by offering the ``msgpack`` WebSocket subprotocol or by
+    connecting with ``?format=msgpack``.
+    """
+
+    msgpack_subprotocol = "msgpack"
+
+    async def accept_with_encoding(self):
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        offered = self.scope.get("subprotocols") or []
+        self.use_msgpack = (
+            self.msgpack_subprotocol in offered
+            or query.get("format", [None])[0] == "msgpack"
+        )
+        subprotocol = (
+            self.msgpack_subprotocol if self.msgpack_subprotocol in offered else None
+        )
+        await self.accept(subprotocol=subprotocol)
+
+    async def send_payload(self, payload):
+        if getattr(self, "use_msgpack", False):
+            await self.send(bytes_data=packb(payload))
+        else:
+            await self.send(text_data=json.dumps(payload))
+
+
+def get_metrics_data():
+    """Get current system metrics from the background sampler"""
+    snapshot = system_metrics.snapshot()
+    if "error" in snapshot:
+        return {
+            "error": snapshot["error"],
+            "hostname": socket.gethostname(),
+            "timestamp": datetime.now().isoformat(),
+        }
+    return {
+        "cpu_percent": snapshot["cpu_percent"],
+        "memory_percent": snapshot["memory_percent"],
+        "disk_percent": snapshot["disk_percent"],
+        "hostname": socket.gethostname(),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+async def produce_metrics():
+    return get_metrics_data()
+
+
+# One producer per cluster sends to the "metrics" group every interval
+metrics_broadcaster = GroupBroadcaster(
+    "metrics", "metrics.update", produce_metrics, "METRICS_BROADCAST_INTERVAL"
+)
+
+
+class MetricsConsumer(ConsumerMetricsMixin, FrameEncodingMixin, AsyncWebsocketConsumer):
+    """Relays the shared metrics broadcast; never samples per connection"""
+
+    metrics_route = "metrics"
 
-class MetricsConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         await self.channel_layer.group_add("metrics", self.channel_name)
-        await self.accept()
+        await self.accept_with_encoding()
 
-        # Start sending metrics updates
-        self.metrics_task = asyncio.create_task(self.send_metrics_updates())
+        # Current metrics right away, periodic updates from the broadcaster
+        metrics_data = await self.get_metrics_data()
+        await self.send_payload({"type": "metrics_update", "data": metrics_data})
+        await metrics_broadcaster.subscribe()
+        self.subscribed = True
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard("metrics", self.channel_name)
 
-        # Cancel the metrics task
-        if hasattr(self, "metrics_task"):
-            self.metrics_task.cancel()
-
-    async def send_metrics_updates(self):
-        """Send metrics updates every 5 seconds"""
-        while True:
-            try:
-                metrics_data = await self.get_metrics_data()
-                await self.send(
-                    text_data=json.dumps(
-                        {"type": "metrics_update", "data": metrics_data}
-                    )
-                )
-                await asyncio.sleep(5)
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                await self.send(
-                    text_data=json.dumps(
-                        {"type": "error", "message": f"Error getting metrics: {str(e)}"}
-                    )
-                )
-                await asyncio.sleep(5)
+        if getattr(self, "subscribed", False):
+            await metrics_broadcaster.unsubscribe()
+            self.subscribed = False
+
+    async def metrics_update(self, event):
+        """Relay a broadcast from the "metrics" group"""
+        await self.send_payload({"type": "metrics_update", "data": event["data"]})
 
     async def get_metrics_data(self):
-        """Get current system metrics"""
-        try:
-            # Get system metrics
-            cpu_percent = await sync_to_async(psutil.cpu_percent)(interval=1)
-            memory = await sync_to_async(psutil.virtual_memory)()
-            disk = await sync_to_async(psutil.disk_usage)("/")
-
-            return {
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory.percent,
-                "disk_percent": disk.percent,
-                "hostname": socket.gethostname(),
-                "timestamp": datetime.now().isoformat(),
-            }
-        except Exception as e:
-            return {
-                "error": str(e),
-                "hostname": socket.gethostname(),
-                "timestamp": datetime.now().isoformat(),
-            }
-
-
-class StatusConsumer(AsyncWebsocketConsumer):
+        return get_metrics_data()
+
+
+# One producer per cluster sends to the "status" group every interval
+status_broadcaster = GroupBroadcaster(
+    "status",
+    "status.update",
+    sync_to_async(get_status_data),
+    "STATUS_BROADCAST_INTERVAL",
+)
+
+
+class StatusConsumer(ConsumerMetricsMixin, FrameEncodingMixin, AsyncWebsocketConsumer):
+    """Relays the shared status broadcast, served from the health prober"""
+
+    metrics_route = "status"
+
     async def connect(self):
         await self.channel_layer.group_add("status", self.channel_name)
-        await self.accept()
+        await self.accept_with_encoding()
 
-        # Start sending status updates
-        self.status_task = asyncio.create_task(self.send_status_updates())
+        # Current status right away, periodic updates from the broadcaster
+        status_data = await self.get_status_data()
+        await self.send_payload({"type": "status_update", "data": status_data})
+        await status_broadcaster.subscribe()
+        self.subscribed = True
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard("status", self.channel_name)
 
-        # Cancel the status task
-        if hasattr(self, "status_task"):
-            self.status_task.cancel()
-
-    async def send_status_updates(self):
-        """Send status updates every 10 seconds"""
-        while True:
-            try:
-                status_data = await self.get_status_data()
-                await self.send(
-                    text_data=json.dumps({"type": "status_update", "data": status_data})
-                )
-                await asyncio.sleep(10)
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                await self.send(
-                    text_data=json.dumps(
-                        {"type": "error", "message": f"Error getting status: {str(e)}"}
-                    )
-                )
-                await asyncio.sleep(10)
+        if getattr(self, "subscribed", False):
+            await status_broadcaster.unsubscribe()
+            self.subscribed = False
+
+    async def status_update(self, event):
+        """Relay a broadcast from the "status" group"""
+        await self.send_payload({"type": "status_update", "data": event["data"]})
 
     async def get_status_data(self):
         """Get current system status"""
-        try:
-            # Test database connection
-            db_status = await self.test_database_connection()
-
-            return {
-                "application": "healthy",
-                "database": db_status,
-                "hostname": socket.gethostname(),
-                "timestamp": datetime.now().isoformat(),
-            }
-        except Exception as e:
-            return {
-                "application": "error",
-                "database": f"Error: {str(e)[:50]}",
-                "hostname": socket.gethostname(),
-                "timestamp": datetime.now().isoformat(),
-            }
-
-    async def test_database_connection(self):
-        """Test database connection asynchronously"""
-        try:
-
-            @sync_to_async
-            def test_db():
-                with connection.cursor() as cursor:
-                    cursor.execute("SELECT 1")
-                return "Connected"
-
-            return await test_db()
-        except Exception as e:
-            return f"Error: {str(e)[:50]}"
+        return await sync_to_async(get_status_data)()
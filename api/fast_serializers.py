@@ -0,0 +1,178 @@
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import CommentSerializer, PostListSerializer, UserSerializer
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path for a ``ModelSerializer``.
+
+    The wrapped serializer's readable fields are compiled once into a list of
+    ``.values()`` lookups and per-field getters. Rows fetched with
+    ``queryset.values(*serializer.values_fields)`` are then turned into the same
+    dicts the DRF serializer would produce, without building model instances
+    or walking ``to_representation`` on bound field objects.
+    """
+
+    # Fields whose DB value is already the rendered value
+    passthrough_field_classes = (
+        serializers.BooleanField,
+        serializers.CharField,
+        serializers.IntegerField,
+        serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, serializer_class, fields=None):
+        self.serializer_class = serializer_class
+        # Optional subset of top-level field names, see `restrict`
+        self.fields = fields
+        self._values_fields = None
+        self._spec = None
+        # Row builders keyed by the active time zone, see `get_row_builder`
+        self._row_builders = {}
+        self._restricted = {}
+
+    @property
+    def values_fields(self):
+        self.compile()
+        return self._values_fields
+
+    def restrict(self, fields):
+        """Return a serializer limited to `fields`, sharing compiled state per subset"""
+        if fields is None:
+            return self
+        fields = tuple(fields)
+        try:
+            return self._restricted[fields]
+        except KeyError:
+            restricted = type(self)(self.serializer_class, fields=fields)
+            self._restricted[fields] = restricted
+            return restricted
+
+    def compile(self):
+        if self._spec is None:
+            serializer = self.serializer_class()
+            if self.fields is not None:
+                for name in set(serializer.fields) - set(self.fields):
+                    serializer.fields.pop(name)
+            lookups = []
+            self._spec = self._compile_serializer(serializer, "", lookups)
+            self._values_fields = tuple(dict.fromkeys(lookups))
+        return self._spec
+
+    def _compile_serializer(self, serializer, prefix, lookups):
+        spec = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == "*" or isinstance(
+                field, (serializers.SerializerMethodField, serializers.ListSerializer)
+            ):
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{name} cannot be read from "
+                    f".values() rows"
+                )
+            lookup = prefix + "__".join(field.source_attrs)
+            lookups.append(lookup)
+            if isinstance(field, serializers.ModelSerializer):
+                nested = self._compile_serializer(field, f"{lookup}__", lookups)
+                spec.append((name, lookup, field, nested))
+            else:
+                spec.append((name, lookup, field, None))
+        return tuple(spec)
+
+    def get_row_builder(self):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        try:
+            return self._row_builders[tz]
+        except KeyError:
+            builder = self._build(self.compile(), tz)
+            self._row_builders[tz] = builder
+            return builder
+
+    def _build(self, spec, tz):
+        getters = []
+        for name, lookup, field, nested in spec:
+            if nested is not None:
+                getter = self._nested_getter(lookup, self._build(nested, tz))
+            elif isinstance(field, self.passthrough_field_classes):
+                getter = itemgetter(lookup)
+            elif self._is_iso_datetime(field, tz):
+                getter = self._datetime_getter(lookup, field, tz)
+            else:
+                getter = self._converting_getter(lookup, field)
+            getters.append((name, getter))
+        getters = tuple(getters)
+
+        def build(row):
+            return {name: getter(row) for name, getter in getters}
+
+        return build
+
+    @staticmethod
+    def _is_iso_datetime(field, tz):
+        if not isinstance(field, serializers.DateTimeField) or tz is None:
+            return False
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        return (
+            isinstance(output_format, str)
+            and output_format.lower() == ISO_8601
+            and not hasattr(field, "timezone")
+        )
+
+    @staticmethod
+    def _nested_getter(lookup, build):
+        def get(row):
+            if row[lookup] is None:
+                return None
+            return build(row)
+
+        return get
+
+    @staticmethod
+    def _datetime_getter(lookup, field, tz):
+        # Inlined DateTimeField.to_representation for aware values and ISO 8601
+        to_representation = field.to_representation
+
+        def get(row):
+            value = row[lookup]
+            if not value:
+                return None
+            if value.tzinfo is None:
+                return to_representation(value)
+            value = value.astimezone(tz).isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return get
+
+    @staticmethod
+    def _converting_getter(lookup, field):
+        to_representation = field.to_representation
+
+        def get(row):
+            value = row[lookup]
+            if value is None:
+                return None
+            return to_representation(value)
+
+        return get
+
+    def to_representation(self, row):
+        return self.get_row_builder()(row)
+
+    def serialize(self, rows):
+        build = self.get_row_builder()
+        return [build(row) for row in rows]
+
+
+fast_post_list_serializer = ValuesSerializer(PostListSerializer)
+fast_comment_serializer = ValuesSerializer(CommentSerializer)
+fast_user_serializer = ValuesSerializer(UserSerializer)
@@ -0,0 +1,86 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarking import seed_rows, time_per_call
+from api.fast_serializers import fast_comment_serializer, fast_post_list_serializer
+from api.models import Comment, Post
+from api.renderers import FastJSONRenderer, orjson, packb, unpackb
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare payload size and encode/decode time of JSON and MessagePack for "
+        "API pages and WebSocket frames. Rows are created in a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=20,
+            help="Rows per API page (default: 20)",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=2000,
+            help="Encodes/decodes timed per payload (default: 2000)",
+        )
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        iterations = options["iterations"]
+        if page_size < 1 or iterations < 1:
+            raise CommandError("--page-size and --iterations must be positive integers")
+
+        with transaction.atomic():
+            seed_rows(page_size)
+            payloads = {
+                "posts page": fast_post_list_serializer.serialize(
+                    Post.objects.values(*fast_post_list_serializer.values_fields)[
+                        :page_size
+                    ]
+                ),
+                "comments page": fast_comment_serializer.serialize(
+                    Comment.objects.values(*fast_comment_serializer.values_fields)[
+                        :page_size
+                    ]
+                ),
+                "metrics frame": {
+                    "type": "metrics_update",
+                    "data": {
+                        "cpu_percent": 12.5,
+                        "memory_percent": 43.1,
+                        "disk_percent": 61.0,
+                        "hostname": "myapp-7d9f8c6b5-x2x4z",
+                        "timestamp": "2025-01-01T10:00:00.123456",
+                    },
+                },
+            }
+            transaction.set_rollback(True)
+
+        encoders = [
+            ("json", JSONRenderer().render, json.loads),
+            (
+                "orjson" if orjson else "json*",
+                FastJSONRenderer().render,
+                orjson.loads if orjson else json.loads,
+            ),
+            ("msgpack", packb, unpackb),
+        ]
+        self.stdout.write(
+            f"{'payload':<14} {'encoding':<8} {'bytes':>8} {'encode us':>10} "
+            f"{'decode us':>10}"
+        )
+        for name, payload in payloads.items():
+            for encoding, encode, decode in encoders:
+                body = encode(payload)
+                encode_time = time_per_call(iterations, encode, payload)
+                decode_time = time_per_call(iterations, decode, body)
+                self.stdout.write(
+                    f"{name:<14} {encoding:<8} {len(body):>8} "
+                    f"{encode_time * 1e6:>10.1f} {decode_time * 1e6:>10.1f}"
+                )
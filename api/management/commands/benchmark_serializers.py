@@ -0,0 +1,101 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarking import best_of, seed_rows
+from api.fast_serializers import (
+    fast_comment_serializer,
+    fast_post_list_serializer,
+    fast_user_serializer,
+)
+from api.models import Comment, Post
+from api.serializers import CommentSerializer, PostListSerializer, UserSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF serializers with the .values() fast path on throwaway rows. "
+        "All rows are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1000,
+            help="Rows serialized per run (default: 1000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs per serializer; the best run is reported (default: 5)",
+        )
+
+    def handle(self, *args, **options):
+        count = options["rows"]
+        repeat = options["repeat"]
+        if count < 1 or repeat < 1:
+            raise CommandError("--rows and --repeat must be positive integers")
+
+        with transaction.atomic():
+            seed_rows(count)
+            cases = [
+                (
+                    "posts",
+                    PostListSerializer,
+                    fast_post_list_serializer,
+                    Post.objects.select_related("author")[:count],
+                ),
+                (
+                    "comments",
+                    CommentSerializer,
+                    fast_comment_serializer,
+                    Comment.objects.select_related("author")[:count],
+                ),
+                (
+                    "users",
+                    UserSerializer,
+                    fast_user_serializer,
+                    User.objects.order_by("id")[:count],
+                ),
+            ]
+            self.stdout.write(
+                f"{'endpoint':<10} {'stage':<10} {'drf ms':>10} {'fast ms':>10} "
+                f"{'speedup':>8}"
+            )
+            for name, serializer_class, fast, queryset in cases:
+                instances = list(queryset)
+                values = list(queryset.values(*fast.values_fields))
+                self.report(
+                    name,
+                    "serialize",
+                    best_of(
+                        repeat, lambda: serializer_class(instances, many=True).data
+                    ),
+                    best_of(repeat, lambda: fast.serialize(values)),
+                )
+                self.report(
+                    name,
+                    "end-to-end",
+                    best_of(
+                        repeat,
+                        lambda: JSONRenderer().render(
+                            serializer_class(list(queryset), many=True).data
+                        ),
+                    ),
+                    best_of(
+                        repeat,
+                        lambda: JSONRenderer().render(
+                            fast.serialize(queryset.values(*fast.values_fields))
+                        ),
+                    ),
+                )
+            transaction.set_rollback(True)
+
+    def report(self, name, stage, slow_time, fast_time):
+        self.stdout.write(
+            f"{name:<10} {stage:<10} {slow_time * 1000:>10.2f} "
+            f"{fast_time * 1000:>10.2f} {slow_time / fast_time:>7.1f}x"
+        )
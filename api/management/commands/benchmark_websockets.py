@@ -0,0 +1,344 @@
+import asyncio
+import gc
+import json
+import time
+from datetime import datetime, timezone
+
+import psutil
+from asgiref.sync import sync_to_async
+from channels.layers import DEFAULT_CHANNEL_LAYER, channel_layers, get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from api.benchmarking import git_commit, percentile
+from api.consumers import get_metrics_data, metrics_broadcaster, status_broadcaster
+from api.health import get_status_data
+
+# Group, event type and socket path of each broadcast
+GROUPS = {
+    "metrics": ("metrics.update", "/ws/metrics/"),
+    "status": ("status.update", "/ws/status/"),
+}
+
+
+class BenchmarkClient:
+    """One socket; counts frames as they arrive and decodes them afterwards"""
+
+    def __init__(self, application, path, group):
+        self.communicator = WebsocketCommunicator(application, path)
+        self.group = group
+        self.frames = []
+        self.reader = None
+
+    async def connect(self, timeout):
+        connected, _ = await self.communicator.connect(timeout=timeout)
+        if not connected:
+            raise CommandError(f"Connection to {self.group} was rejected")
+        # The current data, sent on connect
+        await self.communicator.receive_output(timeout=timeout)
+
+    def start_reading(self, on_frame):
+        async def read():
+            while True:
+                message = await self.communicator.output_queue.get()
+                if message["type"] != "websocket.send":
+                    return
+                self.frames.append((time.perf_counter(), message))
+                on_frame(self.group)
+
+        self.reader = asyncio.create_task(read())
+
+    async def disconnect(self):
+        if self.reader is not None:
+            self.reader.cancel()
+        await self.communicator.disconnect()
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many WebSocket clients against config.asgi:application in this "
+        "process and measure connect rate, memory per connection, CPU and "
+        "broadcast latency of the metrics and status groups."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=1000,
+            help="Sockets per group (default: 1000)",
+        )
+        parser.add_argument(
+            "--groups",
+            default="metrics,status",
+            help="Comma-separated groups to load (default: metrics,status)",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=20,
+            help="Broadcasts per group (default: 20)",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0.2,
+            help="Seconds between broadcast rounds (default: 0.2)",
+        )
+        parser.add_argument(
+            "--connect-batch",
+            type=int,
+            default=100,
+            help="Sockets opened concurrently (default: 100)",
+        )
+        parser.add_argument(
+            "--layer",
+            choices=["memory", "redis"],
+            default="memory",
+            help="Channel layer: InMemoryChannelLayer or Redis at --redis-url "
+            "(default: memory)",
+        )
+        parser.add_argument(
+            "--redis-url",
+            default=None,
+            help="Redis for --layer redis (default: REDIS_URL)",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=30.0,
+            help="Seconds to wait for a connection or a round (default: 30)",
+        )
+        parser.add_argument(
+            "--report",
+            help="Write a JSON report to this path ('-' prints only the report)",
+        )
+
+    def handle(self, *args, **options):
+        groups = [group.strip() for group in options["groups"].split(",")]
+        unknown = set(groups) - set(GROUPS)
+        if unknown:
+            raise CommandError(f"Unknown groups: {', '.join(sorted(unknown))}")
+        for name in ("clients", "rounds", "connect_batch"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive")
+
+        if options["layer"] == "memory":
+            layer = {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+        else:
+            layer = {
+                "BACKEND": "channels_redis.core.RedisChannelLayer",
+                "CONFIG": {
+                    "hosts": [
+                        options["redis_url"]
+                        or settings.CHANNEL_LAYERS["default"]["CONFIG"]["hosts"][0]
+                    ]
+                },
+            }
+        broadcasters = (metrics_broadcaster, status_broadcaster)
+        previous = channel_layers.set(
+            DEFAULT_CHANNEL_LAYER,
+            import_string(layer["BACKEND"])(**layer.get("CONFIG", {})),
+        )
+        # The benchmark sends every broadcast itself; keep the regular
+        # producers from adding frames in between
+        for broadcaster in broadcasters:
+            broadcaster.paused = True
+        try:
+            from config.asgi import application
+
+            report = asyncio.run(self.run(application, groups, options))
+        finally:
+            for broadcaster in broadcasters:
+                broadcaster.paused = False
+            if previous is None:
+                channel_layers.backends.pop(DEFAULT_CHANNEL_LAYER, None)
+            else:
+                channel_layers.set(DEFAULT_CHANNEL_LAYER, previous)
+
+        if options["report"] == "-":
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.print_report(report)
+        if options["report"]:
+            with open(options["report"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+    async def run(self, application, groups, options):
+        process = psutil.Process()
+        clients = {
+            group: [
+                BenchmarkClient(application, GROUPS[group][1], group)
+                for _ in range(options["clients"])
+            ]
+            for group in groups
+        }
+        everyone = [client for members in clients.values() for client in members]
+
+        gc.collect()
+        rss_before = process.memory_info().rss
+        start = time.perf_counter()
+        batch = options["connect_batch"]
+        for i in range(0, len(everyone), batch):
+            await asyncio.gather(
+                *(
+                    client.connect(options["timeout"])
+                    for client in everyone[i : i + batch]
+                )
+            )
+        connect_seconds = time.perf_counter() - start
+        gc.collect()
+        rss_after = process.memory_info().rss
+        self.stderr.write(
+            f"{len(everyone)} sockets open after {connect_seconds:.2f}s; "
+            f"broadcasting {options['rounds']} rounds per group"
+        )
+
+        received = dict.fromkeys(groups, 0)
+        waiting = {}
+
+        def on_frame(group):
+            received[group] += 1
+            target, event = waiting.get(group, (None, None))
+            if target is not None and received[group] >= target:
+                event.set()
+
+        for client in everyone:
+            client.start_reading(on_frame)
+
+        payloads = {
+            "metrics": await sync_to_async(get_metrics_data)(),
+            "status": await sync_to_async(get_status_data)(),
+        }
+        channel_layer = get_channel_layer()
+        sends = {group: [] for group in groups}
+        fan_out = {group: [] for group in groups}
+        timeouts = 0
+        cpu_before = process.cpu_times()
+        broadcast_start = time.perf_counter()
+        for round_number in range(options["rounds"]):
+            for group in groups:
+                event = asyncio.Event()
+                waiting[group] = (received[group] + len(clients[group]), event)
+                message_type = GROUPS[group][0]
+                sent_at = time.perf_counter()
+                sends[group].append(sent_at)
+                await channel_layer.group_send(
+                    group,
+                    {
+                        "type": message_type,
+                        "data": {**payloads[group], "benchmark_round": round_number},
+                        "sent_at": time.time(),
+                    },
+                )
+                try:
+                    await asyncio.wait_for(event.wait(), options["timeout"])
+                except asyncio.TimeoutError:
+                    timeouts += 1
+                fan_out[group].append(time.perf_counter() - sent_at)
+            await asyncio.sleep(options["interval"])
+        broadcast_seconds = time.perf_counter() - broadcast_start
+        cpu_after = process.cpu_times()
+
+        start = time.perf_counter()
+        for i in range(0, len(everyone), batch):
+            await asyncio.gather(
+                *(client.disconnect() for client in everyone[i : i + batch])
+            )
+        disconnect_seconds = time.perf_counter() - start
+
+        cpu_seconds = (cpu_after.user + cpu_after.system) - (
+            cpu_before.user + cpu_before.system
+        )
+        report = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "layer": options["layer"],
+            "clients_per_group": options["clients"],
+            "groups": {},
+            "connections": len(everyone),
+            "connect_seconds": round(connect_seconds, 3),
+            "connects_per_second": round(len(everyone) / connect_seconds, 1),
+            "disconnect_seconds": round(disconnect_seconds, 3),
+            "memory_per_connection_kib": round(
+                (rss_after - rss_before) / len(everyone) / 1024, 2
+            ),
+            "rss_mib": round(rss_after / 1024 / 1024, 1),
+            "timeouts": timeouts,
+            # Includes the benchmark clients, which share the process
+            "cpu": {
+                "cpu_seconds": round(cpu_seconds, 3),
+                "cores": round(cpu_seconds / broadcast_seconds, 3),
+                "cpu_us_per_frame": None,
+            },
+        }
+        frames = 0
+        for group in groups:
+            latencies = []
+            for client in clients[group]:
+                for arrival, message in client.frames:
+                    round_number = frame_round(message)
+                    if round_number is not None:
+                        latencies.append(arrival - sends[group][round_number])
+            latencies.sort()
+            frames += len(latencies)
+            report["groups"][group] = {
+                "frames": len(latencies),
+                "expected_frames": options["rounds"] * len(clients[group]),
+                "latency_ms": latency_summary(latencies),
+                # Until the last socket of a round received its frame
+                "fan_out_ms": latency_summary(sorted(fan_out[group])),
+            }
+        if frames:
+            report["cpu"]["cpu_us_per_frame"] = round(cpu_seconds * 1e6 / frames, 2)
+        return report
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['connections']} connections over the {report['layer']} layer: "
+            f"{report['connects_per_second']:.0f} connects/s, "
+            f"{report['memory_per_connection_kib']:.1f} KiB each"
+        )
+        self.stdout.write(
+            f"{'group':<8} {'frames':>8} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'p99 ms':>9} {'fan-out p99 ms':>15}"
+        )
+        for group, stats in report["groups"].items():
+            latency = stats["latency_ms"]
+            self.stdout.write(
+                f"{group:<8} {stats['frames']:>8} {fmt(latency['p50']):>9} "
+                f"{fmt(latency['p95']):>9} {fmt(latency['p99']):>9} "
+                f"{fmt(stats['fan_out_ms']['p99']):>15}"
+            )
+        cpu = report["cpu"]
+        self.stdout.write(
+            f"CPU while broadcasting: {cpu['cores']:.2f} cores, "
+            f"{cpu['cpu_us_per_frame']} us per frame"
+        )
+        if report["timeouts"]:
+            self.stdout.write(f"Rounds that timed out: {report['timeouts']}")
+
+
+def frame_round(message):
+    """Benchmark round of a relayed frame, None for other frames"""
+    payload = json.loads(message["text"])
+    return payload.get("data", {}).get("benchmark_round")
+
+
+def latency_summary(ordered):
+    return {
+        name: round(value * 1000, 3) if value is not None else None
+        for name, value in (
+            ("p50", percentile(ordered, 50)),
+            ("p95", percentile(ordered, 95)),
+            ("p99", percentile(ordered, 99)),
+            ("max", ordered[-1] if ordered else None),
+        )
+    }
+
+
+def fmt(value):
+    return f"{value:.2f}" if value is not None else "-"
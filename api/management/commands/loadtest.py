@@ -0,0 +1,637 @@
+import http.client
+import json
+import os
+import queue
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from importlib import import_module
+from urllib.parse import urlsplit
+
+import psutil
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.crypto import get_random_string
+from prometheus_client.parser import text_string_to_metric_families
+
+from api.benchmarking import git_commit, percentile
+from api.models import Post
+
+OPERATIONS = ("health", "list", "detail", "create", "comment")
+DEFAULT_MIX = "health=1,list=4,detail=3,create=1,comment=1"
+
+
+def parse_mix(value):
+    """``"list=4,detail=3"`` -> ``{"list": 4.0, "detail": 3.0}``"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(
+                f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}"
+            )
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight for {name!r}: {weight!r}")
+        if mix[name] < 0:
+            raise CommandError(f"Invalid weight for {name!r}: {weight!r}")
+    if not any(mix.values()):
+        raise CommandError("--mix needs at least one operation with a weight")
+    return mix
+
+
+def summarize(results, elapsed):
+    """Throughput, error rate and latency (ms) of ``(latency, status)`` pairs"""
+    latencies = sorted(latency for latency, _ in results)
+    statuses = {}
+    errors = 0
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if not isinstance(status, int) or status >= 400:
+            errors += 1
+    return {
+        "requests": len(results),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "statuses": statuses,
+        "latency_ms": {
+            name: round(value * 1000, 3) if value is not None else None
+            for name, value in (
+                ("p50", percentile(latencies, 50)),
+                ("p95", percentile(latencies, 95)),
+                ("p99", percentile(latencies, 99)),
+                ("max", latencies[-1] if latencies else None),
+                ("mean", sum(latencies) / len(latencies) if latencies else None),
+            )
+        },
+    }
+
+
+class Client:
+    """Keep-alive HTTP/1.1 connection of one load-generating thread"""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=timeout)
+        self.headers = {
+            "Accept": "application/json",
+            # Production settings trust this from the ingress and redirect
+            # plain HTTP otherwise
+            "X-Forwarded-Proto": "https",
+        }
+
+    def request(self, method, path, body=None, headers=None):
+        """Status code of the response, or the name of the exception raised"""
+        headers = {**self.headers, **(headers or {})}
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.connection.close()
+            return type(e).__name__
+
+    def get_text(self, path):
+        """Body of a GET response as text; None unless the status is 200"""
+        try:
+            self.connection.request("GET", path, headers=self.headers)
+            response = self.connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return None
+        return body.decode() if response.status == 200 else None
+
+    def close(self):
+        self.connection.close()
+
+
+class Workload:
+    """The requests behind each operation of the mix"""
+
+    def __init__(self, post_ids, write_headers):
+        self.post_ids = post_ids
+        self.write_headers = write_headers
+
+    def run(self, client, operation, rng):
+        if operation == "health":
+            return client.request("GET", "/health/")
+        if operation == "list":
+            return client.request("GET", "/api/v1/posts/")
+        if operation == "detail":
+            return client.request("GET", f"/api/v1/posts/{rng.choice(self.post_ids)}/")
+        if operation == "create":
+            return client.request(
+                "POST",
+                "/api/v1/posts/",
+                {"title": "Load test post", "content": "Load test", "published": True},
+                self.write_headers,
+            )
+        return client.request(
+            "POST",
+            "/api/v1/comments/",
+            {"post": rng.choice(self.post_ids), "content": "Load test comment"},
+            self.write_headers,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a local server (or --url) with an open- or closed-loop mix of API "
+        "requests and report throughput, latency percentiles, error rates and "
+        "queries per request. The target must use this project's database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--server",
+            choices=["asgi", "wsgi"],
+            default="asgi",
+            help="Server started for the run: asgi runs Daphne (1 worker) or "
+            "Gunicorn with Uvicorn workers, wsgi runs Gunicorn (default: asgi)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Server worker processes (default: 1)",
+        )
+        parser.add_argument(
+            "--url",
+            help="Load an already running server instead of starting one",
+        )
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help=f"Weighted operations (default: {DEFAULT_MIX})",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=["closed", "open"],
+            default="closed",
+            help="closed: each client sends its next request when the last one "
+            "finishes; open: requests arrive at --rate regardless of responses "
+            "(default: closed)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Clients, or the most requests in flight in open mode (default: 10)",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=100.0,
+            help="Mean arrivals per second in open mode (default: 100)",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=30.0,
+            help="Measured seconds (default: 30)",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=float,
+            default=5.0,
+            help="Seconds of load before measuring starts (default: 5)",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=10.0,
+            help="Seconds before a request counts as failed (default: 10)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the operation and arrival sequence (default: 0)",
+        )
+        parser.add_argument(
+            "--keep-throttling",
+            action="store_true",
+            help="Keep the configured DRF throttle rates on the started server",
+        )
+        parser.add_argument(
+            "--report",
+            help="Write a JSON report to this path ('-' prints only the report)",
+        )
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options["mix"])
+        if options["concurrency"] < 1 or options["workers"] < 1:
+            raise CommandError("--concurrency and --workers must be positive integers")
+        if options["duration"] <= 0 or options["warmup"] < 0 or options["rate"] <= 0:
+            raise CommandError("--duration and --rate must be positive")
+
+        server = None
+        url = options["url"]
+        if url is None:
+            server = self.start_server(options)
+            url = server.url
+        try:
+            workload = self.prepare(url)
+            report = self.measure(url, workload, mix, options, server)
+        finally:
+            if server is not None:
+                server.stop()
+
+        if options["report"] == "-":
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.print_report(report)
+        if options["report"]:
+            with open(options["report"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+    def start_server(self, options):
+        server = LocalServer(
+            options["server"], options["workers"], options["keep_throttling"]
+        )
+        # Progress goes to stderr so --report - stays parseable
+        self.stderr.write(f"Starting {' '.join(server.command)}")
+        server.start()
+        return server
+
+    def prepare(self, url):
+        """Posts to read and comment on, and a session for the writes"""
+        user, _ = User.objects.get_or_create(
+            username="loadtest", defaults={"email": "loadtest@example.com"}
+        )
+        post_ids = list(
+            Post.objects.filter(published=True).values_list("id", flat=True)[:100]
+        )
+        if not post_ids:
+            post_ids = [
+                Post.objects.create(
+                    title=f"Load test post {i}",
+                    content="Load test",
+                    author=user,
+                    published=True,
+                ).id
+                for i in range(20)
+            ]
+
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        csrf_token = get_random_string(32)
+        return Workload(
+            post_ids,
+            {
+                "Cookie": f"{settings.SESSION_COOKIE_NAME}={session.session_key}; "
+                f"{settings.CSRF_COOKIE_NAME}={csrf_token}",
+                "X-CSRFToken": csrf_token,
+                # Checked for requests seen as HTTPS
+                "Referer": f"https://{urlsplit(url).netloc}/",
+            },
+        )
+
+    def measure(self, url, workload, mix, options, server):
+        operations = [op for op, weight in mix.items() if weight > 0]
+        weights = [mix[op] for op in operations]
+        warmup, duration = options["warmup"], options["duration"]
+        self.stderr.write(
+            f"{options['mode']}-loop load for {warmup:g}s warmup + {duration:g}s"
+        )
+
+        start = time.perf_counter()
+        measure_from = start + warmup
+        deadline = measure_from + duration
+        samples = {}
+        queries = {}
+        cpu = {}
+
+        def at_measure_start():
+            queries["before"] = scrape_queries(url, options["timeout"])
+            cpu["before"] = server.cpu_seconds() if server else None
+
+        timer = threading.Timer(warmup, at_measure_start)
+        timer.start()
+        if options["mode"] == "closed":
+            dropped = 0
+            results = self.closed_loop(
+                url, workload, operations, weights, options, deadline
+            )
+        else:
+            results, dropped = self.open_loop(
+                url, workload, operations, weights, options, start, deadline
+            )
+        timer.join()
+        cpu_after = server.cpu_seconds() if server else None
+        queries_after = scrape_queries(url, options["timeout"])
+
+        for started, operation, latency, status in results:
+            if started >= measure_from:
+                samples.setdefault(operation, []).append((latency, status))
+        measured = [sample for values in samples.values() for sample in values]
+        report = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "target": url,
+            "server": (
+                {"kind": server.kind, "workers": server.workers} if server else None
+            ),
+            "mode": options["mode"],
+            "mix": mix,
+            "concurrency": options["concurrency"],
+            "rate": options["rate"] if options["mode"] == "open" else None,
+            "warmup_s": warmup,
+            "duration_s": duration,
+            "seed": options["seed"],
+            "dropped": dropped,
+            **summarize(measured, duration),
+            "operations": {
+                operation: summarize(samples.get(operation, []), duration)
+                for operation in operations
+            },
+            "queries_per_request": queries_per_request(
+                queries.get("before"), queries_after
+            ),
+        }
+        if cpu.get("before") is not None and cpu_after is not None:
+            cpu_seconds = cpu_after - cpu["before"]
+            report["server_cpu"] = {
+                "cpu_seconds": round(cpu_seconds, 3),
+                "cores": round(cpu_seconds / duration, 3),
+                "cpu_ms_per_request": (
+                    round(cpu_seconds * 1000 / len(measured), 3) if measured else None
+                ),
+            }
+        return report
+
+    def closed_loop(self, url, workload, operations, weights, options, deadline):
+        results = []
+
+        def client_loop(index):
+            rng = random.Random(options["seed"] * 1_000_003 + index)
+            client = Client(url, options["timeout"])
+            local = []
+            while (started := time.perf_counter()) < deadline:
+                operation = rng.choices(operations, weights)[0]
+                status = workload.run(client, operation, rng)
+                local.append(
+                    (started, operation, time.perf_counter() - started, status)
+                )
+            client.close()
+            results.extend(local)
+
+        run_threads(client_loop, options["concurrency"])
+        return results
+
+    def open_loop(self, url, workload, operations, weights, options, start, deadline):
+        """
+        Poisson arrivals; latency counts from the scheduled arrival, so time a
+        request spends waiting for a free client is included.
+        """
+        arrivals = queue.Queue()
+        results = []
+
+        def client_loop(index):
+            rng = random.Random(options["seed"] * 1_000_003 + index)
+            client = Client(url, options["timeout"])
+            local = []
+            while (item := arrivals.get()) is not None:
+                scheduled, operation = item
+                status = workload.run(client, operation, rng)
+                local.append(
+                    (scheduled, operation, time.perf_counter() - scheduled, status)
+                )
+            client.close()
+            results.extend(local)
+
+        threads = run_threads(client_loop, options["concurrency"], wait=False)
+        rng = random.Random(options["seed"])
+        scheduled = start
+        while True:
+            scheduled += rng.expovariate(options["rate"])
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            arrivals.put((scheduled, rng.choices(operations, weights)[0]))
+
+        # Arrivals nobody got to before the end are reported, not sent
+        dropped = 0
+        while True:
+            try:
+                arrivals.get_nowait()
+            except queue.Empty:
+                break
+            dropped += 1
+        for _ in threads:
+            arrivals.put(None)
+        for thread in threads:
+            thread.join()
+        return results, dropped
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{'operation':<10} {'requests':>9} {'rps':>9} {'errors':>7} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        rows = [*report["operations"].items(), ("total", report)]
+        for name, stats in rows:
+            latency = {
+                key: f"{value:.2f}" if value is not None else "-"
+                for key, value in stats["latency_ms"].items()
+            }
+            self.stdout.write(
+                f"{name:<10} {stats['requests']:>9} {stats['throughput_rps']:>9.1f} "
+                f"{stats['errors']:>7} {latency['p50']:>9} {latency['p95']:>9} "
+                f"{latency['p99']:>9}"
+            )
+        if report["dropped"]:
+            self.stdout.write(f"Dropped arrivals: {report['dropped']}")
+        for route, value in report["queries_per_request"].items():
+            self.stdout.write(f"Queries per request, {route}: {value:.2f}")
+        if "server_cpu" in report:
+            cpu = report["server_cpu"]
+            self.stdout.write(
+                f"Server CPU: {cpu['cores']:.2f} cores, "
+                f"{cpu['cpu_ms_per_request']} ms per request"
+            )
+
+
+def run_threads(target, count, wait=True):
+    threads = [
+        threading.Thread(target=target, args=(i,), name=f"loadtest-{i}", daemon=True)
+        for i in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    if wait:
+        for thread in threads:
+            thread.join()
+    return threads
+
+
+def scrape_queries(url, timeout):
+    """``{route: (query sum, request count)}`` from the target's /prometheus/"""
+    client = Client(url, timeout)
+    text = client.get_text("/prometheus/")
+    client.close()
+    if text is None:
+        return {}
+    totals = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != "db_queries_per_request":
+            continue
+        for sample in family.samples:
+            route = sample.labels.get("endpoint")
+            if route == "prometheus-metrics":
+                # The scrapes themselves
+                continue
+            queries, count = totals.get(route, (0.0, 0.0))
+            if sample.name.endswith("_sum"):
+                totals[route] = (sample.value, count)
+            elif sample.name.endswith("_count"):
+                totals[route] = (queries, sample.value)
+    return totals
+
+
+def queries_per_request(before, after):
+    """Mean queries per request and route between two scrapes"""
+    if before is None:
+        return {}
+    means = {}
+    for route, (queries, count) in sorted(after.items()):
+        queries_before, count_before = before.get(route, (0.0, 0.0))
+        if count > count_before:
+            means[route] = round((queries - queries_before) / (count - count_before), 2)
+    return means
+
+
+class LocalServer:
+    """A server process on a free local port, run like the image runs it"""
+
+    def __init__(self, kind, workers, keep_throttling):
+        self.kind = kind
+        self.workers = workers
+        self.keep_throttling = keep_throttling
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        bind = f"127.0.0.1:{self.port}"
+        if kind == "wsgi":
+            self.command = [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "config.wsgi:application",
+                "-b",
+                bind,
+                "-w",
+                str(workers),
+            ]
+        elif workers > 1:
+            self.command = [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "config.asgi:application",
+                "-c",
+                "config/gunicorn.conf.py",
+                "-b",
+                bind,
+                "-w",
+                str(workers),
+            ]
+        else:
+            self.command = [
+                sys.executable,
+                "-m",
+                "daphne",
+                "-b",
+                "127.0.0.1",
+                "-p",
+                str(self.port),
+                "config.asgi:application",
+            ]
+        self.process = None
+
+    def start(self, timeout=30):
+        self.metrics_dir = tempfile.mkdtemp(prefix="loadtest-prometheus-")
+        self.log = tempfile.TemporaryFile()
+        env = {
+            **os.environ,
+            # Workers of one run share their metrics through this directory
+            "PROMETHEUS_MULTIPROC_DIR": self.metrics_dir,
+        }
+        env.setdefault("ALLOWED_HOSTS", "127.0.0.1,localhost")
+        if not self.keep_throttling:
+            env["THROTTLE_RATE_ANON"] = env["THROTTLE_RATE_USER"] = "1000000/s"
+        self.process = subprocess.Popen(
+            self.command,
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            client = Client(self.url, 1)
+            status = client.request("GET", "/health/")
+            client.close()
+            if status == 200:
+                return
+            time.sleep(0.2)
+        log = self.output()
+        self.stop()
+        raise CommandError(f"Server did not become healthy:\n{log}")
+
+    def cpu_seconds(self):
+        """User and system CPU time of the server and its workers"""
+        try:
+            root = psutil.Process(self.process.pid)
+            total = 0.0
+            for process in [root, *root.children(recursive=True)]:
+                times = process.cpu_times()
+                total += times.user + times.system
+            return total
+        except psutil.Error:
+            return None
+
+    def output(self):
+        self.log.seek(0)
+        return self.log.read().decode(errors="replace")[-4000:]
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
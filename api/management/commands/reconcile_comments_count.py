@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F
+
+from api.models import Post, TableVersion
+
+
+class Command(BaseCommand):
+    help = "Recompute drifted Post.comments_count values in primary-key batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of posts checked per batch (default: 1000)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted posts without updating them",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive integer")
+
+        last_pk = 0
+        checked = 0
+        drifted = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            checked += len(batch)
+
+            stale = list(
+                Post.objects.filter(pk__in=batch)
+                .annotate(actual=Count("comments"))
+                .exclude(comments_count=F("actual"))
+                .values_list("pk", flat=True)
+            )
+            if not stale:
+                continue
+            drifted += len(stale)
+            if not options["dry_run"]:
+                # Recount inside the UPDATE so concurrent comment writes are not lost
+                Post.objects.filter(pk__in=stale).reconcile_comments_count()
+
+        if drifted and not options["dry_run"]:
+            # Queryset updates bypass the signals that version the table
+            TableVersion.bump(Post)
+
+        action = "Found" if options["dry_run"] else "Reconciled"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {drifted} drifted post(s) out of {checked} checked"
+            )
+        )
@@ -0,0 +1,364 @@
+import csv
+import io
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+
+from api.models import Comment, Post, TableVersion
+
+# Every timestamp falls in the `--days` after this, so a seed always produces
+# the same rows
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo "
+    "consequat duis aute irure in reprehenderit voluptate velit esse cillum "
+    "fugiat nulla pariatur excepteur sint occaecat cupidatat non proident sunt "
+    "culpa qui officia deserunt mollit anim id est laborum"
+).split()
+FIRST_NAMES = ("Ada", "Alan", "Grace", "Linus", "Margaret", "Ken", "Barbara", "Guido")
+LAST_NAMES = ("Lovelace", "Turing", "Hopper", "Torvalds", "Hamilton", "Liskov")
+
+# Distinct texts generated per kind; rows pick from these instead of
+# building a new text each
+TEXT_POOL_SIZE = 1000
+# Mean delay between a post and one of its comments
+COMMENT_DELAY = timedelta(days=2)
+# Share of posts that are published
+PUBLISHED_RATIO = 0.8
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert large volumes of synthetic users, posts and comments with skewed "
+        "activity: a few prolific authors and a few popular posts. The same "
+        "--seed always produces the same rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=50_000,
+            help="Users to create (default: 50000)",
+        )
+        parser.add_argument(
+            "--posts",
+            type=int,
+            default=500_000,
+            help="Posts to create (default: 500000)",
+        )
+        parser.add_argument(
+            "--comments",
+            type=int,
+            default=2_000_000,
+            help="Comments to create (default: 2000000)",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.0,
+            help="Zipf exponent of author activity and post popularity; "
+            "0 spreads rows evenly (default: 1.0)",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Days of activity the timestamps span (default: 365)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed; also part of the usernames (default: 0)",
+        )
+        parser.add_argument(
+            "--method",
+            choices=["auto", "bulk_create", "copy"],
+            default="auto",
+            help="Insert with bulk_create or PostgreSQL COPY; auto uses COPY on "
+            "PostgreSQL (default: auto)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Rows per bulk_create or COPY statement (default: 10000)",
+        )
+
+    def handle(self, *args, **options):
+        for name in ("users", "posts", "days", "batch_size"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive")
+        if options["comments"] < 0 or options["skew"] < 0:
+            raise CommandError("--comments and --skew must not be negative")
+        method = options["method"]
+        if method == "auto":
+            method = "copy" if connection.vendor == "postgresql" else "bulk_create"
+        if method == "copy" and connection.vendor != "postgresql":
+            raise CommandError("--method copy needs PostgreSQL")
+
+        self.prefix = f"perf-{options['seed']}-"
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f"Users of --seed {options['seed']} already exist; pick another "
+                "seed or start from an empty database"
+            )
+        self.rng = random.Random(options["seed"])
+        self.span = timedelta(days=options["days"]).total_seconds()
+        self.batch_size = options["batch_size"]
+        self.insert = self.copy if method == "copy" else self.bulk_create
+
+        if settings.DEBUG:
+            self.stderr.write(
+                "DEBUG is on: every INSERT is formatted for the query log, which "
+                "slows seeding down; the log is cleared after each batch"
+            )
+        start = time.perf_counter()
+        with large_page_cache(), transaction.atomic():
+            user_ids = self.seed_users(options["users"], options["skew"])
+            post_ids, post_times = self.seed_posts(
+                options["posts"], options["comments"], options["skew"], user_ids
+            )
+            self.seed_comments(options["comments"], user_ids, post_ids, post_times)
+            # Neither bulk_create nor COPY sends the signals that version tables
+            TableVersion.bump(User, Post, Comment)
+        elapsed = time.perf_counter() - start
+
+        rows = options["users"] + options["posts"] + options["comments"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {options['users']} users, {options['posts']} posts and "
+                f"{options['comments']} comments with {method} in {elapsed:.1f}s "
+                f"({rows / elapsed:.0f} rows/s)"
+            )
+        )
+
+    def seed_users(self, count, skew):
+        joined = self.timestamps(count)
+        rows = (
+            (
+                f"{self.prefix}{i}",
+                f"{self.prefix}{i}@example.com",
+                self.rng.choice(FIRST_NAMES),
+                self.rng.choice(LAST_NAMES),
+                # Unusable, see django.contrib.auth.hashers.is_password_usable
+                "!",
+                False,
+                False,
+                True,
+                joined[i],
+            )
+            for i in range(count)
+        )
+        columns = (
+            "username",
+            "email",
+            "first_name",
+            "last_name",
+            "password",
+            "is_superuser",
+            "is_staff",
+            "is_active",
+            "date_joined",
+        )
+        before = self.last_id(User)
+        self.insert(User, columns, rows, count)
+        user_ids = self.ids_after(User, before)
+        # Activity weights, shuffled so the busiest users are not the first ids
+        self.user_weights = self.zipf_weights(count, skew)
+        return user_ids
+
+    def seed_posts(self, count, comments, skew, user_ids):
+        authors = self.pick(user_ids, self.user_weights, count)
+        created = self.timestamps(count)
+        # Draw the post of every comment now, so comments_count is right from
+        # the first INSERT
+        popularity = self.zipf_weights(count, skew)
+        self.comment_posts = array("L")
+        for i in range(0, comments, self.batch_size):
+            self.comment_posts.extend(
+                self.pick(range(count), popularity, min(self.batch_size, comments - i))
+            )
+        comments_count = array("L", [0]) * count
+        for post in self.comment_posts:
+            comments_count[post] += 1
+
+        titles = self.text_pool(3, 10)
+        contents = self.text_pool(30, 300)
+        rows = (
+            (
+                self.rng.choice(titles).capitalize()[:200],
+                self.rng.choice(contents),
+                authors[i],
+                created[i],
+                created[i],
+                self.rng.random() < PUBLISHED_RATIO,
+                comments_count[i],
+            )
+            for i in range(count)
+        )
+        columns = (
+            "title",
+            "content",
+            "author_id",
+            "created_at",
+            "updated_at",
+            "published",
+            "comments_count",
+        )
+        before = self.last_id(Post)
+        self.insert(Post, columns, rows, count)
+        return self.ids_after(Post, before), created
+
+    def seed_comments(self, count, user_ids, post_ids, post_times):
+        end = START + timedelta(seconds=self.span)
+        contents = self.text_pool(5, 60)
+        # Drawn before the per-row values, so --batch-size cannot change the
+        # order of the draws
+        authors = array("L")
+        for i in range(0, count, self.batch_size):
+            authors.extend(
+                self.pick(user_ids, self.user_weights, min(self.batch_size, count - i))
+            )
+
+        def rows():
+            for post, author in zip(self.comment_posts, authors):
+                delay = self.rng.expovariate(1 / COMMENT_DELAY.total_seconds())
+                yield (
+                    post_ids[post],
+                    author,
+                    self.rng.choice(contents),
+                    min(post_times[post] + timedelta(seconds=delay), end),
+                )
+
+        self.insert(
+            Comment, ("post_id", "author_id", "content", "created_at"), rows(), count
+        )
+
+    def bulk_create(self, model, columns, rows, count):
+        fields = [model._meta.get_field(column) for column in columns]
+        with explicit_timestamps(fields):
+            for batch in self.batches(model, rows, count):
+                model.objects.bulk_create(
+                    [model(**dict(zip(columns, row))) for row in batch],
+                    batch_size=self.batch_size,
+                )
+
+    def copy(self, model, columns, rows, count):
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        names = ", ".join(
+            quote(model._meta.get_field(column).column) for column in columns
+        )
+        sql = f"COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)"
+        with connection.cursor() as cursor:
+            for batch in self.batches(model, rows, count):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                if hasattr(cursor, "copy_expert"):
+                    cursor.copy_expert(sql, buffer)
+                else:
+                    # psycopg 3
+                    with cursor.copy(sql) as copy:
+                        copy.write(buffer.getvalue())
+
+    def batches(self, model, rows, count):
+        """Split `rows` into batches, reporting progress to stderr"""
+        done = 0
+        start = time.perf_counter()
+        while done < count:
+            batch = [row for _, row in zip(range(self.batch_size), rows)]
+            yield batch
+            # Under DEBUG, drop the SQL of the batch from connection.queries
+            reset_queries()
+            done += len(batch)
+            elapsed = time.perf_counter() - start
+            self.stderr.write(
+                f"\r{model._meta.verbose_name_plural}: {done}/{count} "
+                f"({done / elapsed:.0f} rows/s)",
+                ending="" if done < count else "\n",
+            )
+
+    def pick(self, population, weights, count):
+        return self.rng.choices(population, cum_weights=weights, k=count)
+
+    def zipf_weights(self, count, skew):
+        """Cumulative weights where the rank-r item weighs 1 / r**skew"""
+        weights = [1 / rank**skew for rank in range(1, count + 1)]
+        self.rng.shuffle(weights)
+        return list(accumulate(weights))
+
+    def timestamps(self, count):
+        """`count` ascending times in the seeded span, so ids follow time"""
+        offsets = sorted(self.rng.random() * self.span for _ in range(count))
+        return [START + timedelta(seconds=offset) for offset in offsets]
+
+    def text_pool(self, min_words, max_words):
+        return [
+            " ".join(self.rng.choices(WORDS, k=self.rng.randint(min_words, max_words)))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+
+    @staticmethod
+    def last_id(model):
+        last = model.objects.order_by("-pk").values_list("pk", flat=True).first()
+        return last or 0
+
+    @staticmethod
+    def ids_after(model, last_id):
+        """Ids of the rows just inserted; seed an otherwise idle database"""
+        return array(
+            "L",
+            model.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=10_000),
+        )
+
+
+@contextmanager
+def explicit_timestamps(fields):
+    """Let bulk_create keep given values of auto_now and auto_now_add fields"""
+    saved = [
+        (field, field.auto_now, field.auto_now_add)
+        for field in fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def large_page_cache():
+    """Give SQLite room for the indexes that random foreign keys hit"""
+    if connection.vendor != "sqlite":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA cache_size")
+        (previous,) = cursor.fetchone()
+        # Negative sizes are KiB: 256 MiB
+        cursor.execute("PRAGMA cache_size = -262144")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA cache_size = {int(previous)}")
@@ -0,0 +1,152 @@
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from . import profiling
+from .queries import finish_request, route_name, start_request
+from .views import ACTIVE_CONNECTIONS, REQUEST_COUNT, REQUEST_DURATION, RESPONSE_SIZE
+
+KNOWN_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE")
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records count, latency, response size and in-flight requests.
+
+    Works in both sync (WSGI) and async (ASGI) stacks. Requests are labelled
+    by the resolved URL name rather than the raw path so label cardinality
+    stays bounded; unresolved paths share the "unmatched" label. The labelled
+    children are cached per label set, which saves the label validation and
+    lookup of ``labels()`` on every request. Goes first in MIDDLEWARE so the
+    time spent in other middleware is included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self._children = {}
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        ACTIVE_CONNECTIONS.inc()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            ACTIVE_CONNECTIONS.dec()
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        ACTIVE_CONNECTIONS.inc()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            ACTIVE_CONNECTIONS.dec()
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, duration):
+        endpoint = route_name(request)
+        method = request.method if request.method in KNOWN_METHODS else "other"
+        key = (method, endpoint, response.status_code)
+        try:
+            count, latency, size = self._children[key]
+        except KeyError:
+            count, latency, size = self._children[key] = (
+                REQUEST_COUNT.labels(method, endpoint, str(response.status_code)),
+                REQUEST_DURATION.labels(method, endpoint),
+                RESPONSE_SIZE.labels(method, endpoint),
+            )
+        count.inc()
+        latency.observe(duration)
+        if not response.streaming:
+            size.observe(len(response.content))
+
+
+class QueryMetricsMiddleware:
+    """
+    Counts and times the database queries of each request.
+
+    Queries are timed by `api.queries.instrument_query`; this attributes them
+    to the current request and exports per-route totals once it is handled.
+    The stats are available to views as ``request.query_stats``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request.query_stats, token = start_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            finish_request(request.query_stats, token)
+
+    async def __acall__(self, request):
+        request.query_stats, token = start_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            finish_request(request.query_stats, token)
+
+
+class ProfilingMiddleware:
+    """
+    Adds the threads of sampled requests to a running route profile.
+
+    See `api.profiling.profile`. Costs one attribute read per request while
+    no profile runs.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sampling = profiling.active_sampling
+        if sampling is None or not sampling.claim(request):
+            return self.get_response(request)
+        ident = threading.get_ident()
+        sampling.threads.add(ident)
+        try:
+            return self.get_response(request)
+        finally:
+            sampling.threads.discard(ident)
+
+    async def __acall__(self, request):
+        sampling = profiling.active_sampling
+        if sampling is None or not sampling.claim(request):
+            return await self.get_response(request)
+        # Sync views run on this request's thread-sensitive executor thread
+        ident = await sync_to_async(threading.get_ident)()
+        sampling.threads.add(ident)
+        try:
+            return await self.get_response(request)
+        finally:
+            sampling.threads.discard(ident)
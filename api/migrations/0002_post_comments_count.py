@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_comments_count(apps, schema_editor):
+    Comment = apps.get_model("api", "Comment")
+    Post = apps.get_model("api", "Post")
+    comments = (
+        Comment.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Post.objects.update(comments_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_comments_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_keyset_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-created_at", "-id"], name="comment_post_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["author", "-created_at"], name="comment_author_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("published", True)),
+                fields=["-created_at", "-id"],
+                name="post_published_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-created_at"], name="post_author_created_idx"
+            ),
+        ),
+    ]
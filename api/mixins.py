@@ -0,0 +1,391 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .models import TableVersion
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET for the `list` and `retrieve` actions.
+
+    ETag and Last-Modified are derived from the `TableVersion` counters of
+    `version_models` (every table the response renders data from) plus the
+    request scheme, host, path, query string and negotiated media type; links
+    in the body are absolute, so the bytes differ per host. Matching
+    If-None-Match / If-Modified-Since requests get a 304 before any query for
+    the resource itself runs or anything is serialized.
+    """
+
+    version_models = ()
+
+    def get_validators(self, request):
+        """Return ``(etag, last_modified)``, computed once per request"""
+        if not hasattr(self, "_validators"):
+            self._validators = self._compute_validators(request)
+        return self._validators
+
+    def _compute_validators(self, request):
+        versions = TableVersion.get_versions(*self.version_models)
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = "|".join(
+            [
+                request.build_absolute_uri(request.path),
+                query,
+                request.accepted_media_type or "",
+                *(f"{label}:{version}" for label, (version, _) in versions.items()),
+            ]
+        )
+        etag = '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+        timestamps = [updated_at for _, updated_at in versions.values()]
+        last_modified = None
+        if all(timestamps):
+            last_modified = int(max(timestamps).timestamp())
+        return etag, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        # The browsable API renders per-user HTML, so it is never validated
+        if not self.version_models or request.accepted_renderer.format == "api":
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class CachedResponseMixin:
+    """
+    Cache rendered `list` and `retrieve` responses in the "api" cache.
+
+    Goes after `ConditionalGetMixin`, whose representation ETag names the
+    entry, so each scheme and host gets bodies with its own absolute links.
+    Any committed write to a table in `version_models` moves readers to
+    a new key and stale entries just expire. Anonymous requests share entries,
+    authenticated users each get their own scope. Misses go through the
+    cache's single-flight `fetch`. ``API_CACHE_TIMEOUT = 0`` disables the cache.
+    """
+
+    cache_alias = "api"
+    cache_key_prefix = "api:response"
+
+    def get_cache_scope(self, request):
+        if request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return "anon"
+
+    def get_response_cache_key(self, request):
+        etag, _ = self.get_validators(request)
+        return ":".join(
+            [self.cache_key_prefix, self.get_cache_scope(request), etag.strip('"')]
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        timeout = settings.API_CACHE_TIMEOUT
+        if (
+            timeout <= 0
+            or not self.version_models
+            or request.accepted_renderer.format == "api"
+        ):
+            return handler(request, *args, **kwargs)
+
+        response = None
+
+        def render():
+            nonlocal response
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return None
+            # Store the rendered bytes; the key already covers the media type
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            return (response.content, response["Content-Type"])
+
+        cached = caches[self.cache_alias].fetch(
+            self.get_response_cache_key(request), render, timeout
+        )
+        if response is not None:
+            return response
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class SparseFieldsetMixin:
+    """
+    Let read requests pick the rendered fields with ``?fields=`` / ``?exclude=``.
+
+    Both take comma-separated top-level serializer field names. The selection
+    trims the serializer output and, through `project_queryset`, the columns
+    and joins of the underlying query.
+    """
+
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+
+    # Readable fields per serializer class, built once per process
+    _readable_fields_cache = {}
+
+    @classmethod
+    def get_readable_fields(cls, serializer_class):
+        try:
+            return cls._readable_fields_cache[serializer_class]
+        except KeyError:
+            fields = {
+                name: field
+                for name, field in serializer_class().fields.items()
+                if not field.write_only
+            }
+            cls._readable_fields_cache[serializer_class] = fields
+            return fields
+
+    def get_sparse_fields(self):
+        """Return the selected field names in serializer order, or None for all"""
+        if not hasattr(self, "_sparse_fields"):
+            self._sparse_fields = self._parse_sparse_fields()
+        return self._sparse_fields
+
+    def _parse_sparse_fields(self):
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = request.query_params
+        requested = self._split(params.get(self.fields_query_param))
+        excluded = self._split(params.get(self.exclude_query_param))
+        if not requested and not excluded:
+            return None
+
+        available = self.get_readable_fields(self.get_serializer_class())
+        errors = {}
+        for param, names in (
+            (self.fields_query_param, requested),
+            (self.exclude_query_param, excluded),
+        ):
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                errors[param] = [f"Unknown field(s): {', '.join(unknown)}"]
+        if errors:
+            raise ValidationError(errors)
+
+        return tuple(
+            name
+            for name in available
+            if (not requested or name in requested) and name not in excluded
+        )
+
+    @staticmethod
+    def _split(value):
+        if not value:
+            return ()
+        return tuple(name.strip() for name in value.split(",") if name.strip())
+
+    def includes_field(self, name):
+        fields = self.get_sparse_fields()
+        return fields is None or name in fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def project_queryset(self, queryset, serializer_class=None):
+        """Restrict the selected columns to what the chosen fields read"""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        readable = self.get_readable_fields(
+            serializer_class or self.get_serializer_class()
+        )
+        only = ["pk", *getattr(self.paginator, "values_fields", ())]
+        for name in fields:
+            field = readable[name]
+            if field.source == "*" or isinstance(
+                field, serializers.SerializerMethodField
+            ):
+                # Method fields work from the primary key or prefetched data
+                continue
+            lookup = "__".join(field.source_attrs)
+            only.append(lookup)
+            if isinstance(field, serializers.ModelSerializer):
+                only.extend(
+                    f"{lookup}__{'__'.join(nested.source_attrs)}"
+                    for nested in field.fields.values()
+                    if not nested.write_only
+                )
+        return queryset.only(*only)
+
+
+class ValuesListMixin:
+    """
+    Serve the `list` action from `.values()` rows.
+
+    `fast_list_serializer` is a `ValuesSerializer` that renders the same
+    output as the viewset's list serializer without building model instances.
+    Sparse fieldsets narrow the `.values()` columns as well as the output.
+    """
+
+    fast_list_serializer = None
+
+    def get_fast_list_serializer(self):
+        fast = self.fast_list_serializer
+        if fast is not None and hasattr(self, "get_sparse_fields"):
+            fast = fast.restrict(self.get_sparse_fields())
+        return fast
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_list_serializer()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # Keyset pagination needs its ordering keys even when not rendered
+        pagination_fields = getattr(self.paginator, "values_fields", ())
+        rows = queryset.values(*dict.fromkeys(fast.values_fields + pagination_fields))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(rows))
+
+
+class BulkCreateMixin:
+    """
+    Create many objects from one list payload.
+
+    A JSON list posted to the collection or to its ``bulk/`` action is
+    validated item by item with a single serializer. The valid items are
+    inserted with one `bulk_create` in a transaction. The response has one
+    result per item, in payload order: the created object or the item's
+    errors. It is 201 if every item was created, 207 if only some were, and
+    400 if none were. ``BULK_CREATE_MAX_ITEMS`` bounds the list length.
+
+    `bulk_create` sends no model signals. `after_bulk_create` does what the
+    signal handlers would do for the created objects.
+    `bulk_related_fields` names `PrefetchedPrimaryKeyRelatedField`s; each is
+    resolved with one query for the whole payload.
+    """
+
+    bulk_related_fields = ()
+
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.bulk_create_response(request)
+        return super().create(request, *args, **kwargs)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Create a list of objects"""
+        return self.bulk_create_response(request)
+
+    def bulk_create_response(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of items."]})
+        limit = settings.BULK_CREATE_MAX_ITEMS
+        if not items or len(items) > limit:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        f"Expected 1 to {limit} items, got {len(items)}."
+                    ]
+                }
+            )
+
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        serializer = serializer_class(context=context)
+        context["related_instances"] = self.load_related_instances(serializer, items)
+
+        results = [None] * len(items)
+        instances = {}
+        for index, item in enumerate(items):
+            try:
+                validated_data = serializer.run_validation(item)
+            except ValidationError as exc:
+                results[index] = {
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": serializers.as_serializer_error(exc),
+                }
+            else:
+                instances[index] = self.bulk_instance(validated_data)
+
+        if instances:
+            model = serializer_class.Meta.model
+            with transaction.atomic():
+                created = model.objects.bulk_create(instances.values())
+                self.after_bulk_create(created)
+            data = serializer_class(created, many=True, context=context).data
+            for index, item_data in zip(instances, data):
+                results[index] = {"status": status.HTTP_201_CREATED, "data": item_data}
+
+        if len(instances) == len(items):
+            response_status = status.HTTP_201_CREATED
+        elif instances:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {
+                "created": len(instances),
+                "failed": len(items) - len(instances),
+                "results": results,
+            },
+            status=response_status,
+        )
+
+    def load_related_instances(self, serializer, items):
+        """``{field name: {pk: instance}}`` for the keys the payload refers to"""
+        related = {}
+        for name in self.bulk_related_fields:
+            queryset = serializer.fields[name].get_queryset()
+            to_python = queryset.model._meta.pk.to_python
+            pks = set()
+            for item in items:
+                value = item.get(name) if isinstance(item, dict) else None
+                if value is None or isinstance(value, bool):
+                    continue
+                try:
+                    pks.add(to_python(value))
+                except (DjangoValidationError, TypeError, ValueError):
+                    # Reported by the field when the item is validated
+                    continue
+            related[name] = queryset.in_bulk(pks)
+        return related
+
+    def bulk_instance(self, validated_data):
+        """Unsaved instance for one valid item; the counterpart of perform_create"""
+        return self.get_serializer_class().Meta.model(**validated_data)
+
+    def after_bulk_create(self, instances):
+        """Runs in the insert's transaction once `instances` have their keys"""
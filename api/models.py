@@ -1,5 +1,21 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import connection, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class PostQuerySet(models.QuerySet):
+    def reconcile_comments_count(self):
+        """Recompute the stored comments_count of every post in the queryset"""
+        comments = (
+            Comment.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        return self.update(comments_count=Coalesce(Subquery(comments), 0))
 
 
 class Post(models.Model):
@@ -11,13 +27,47 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     published = models.BooleanField(default=False)
+    # Maintained by the Comment signal handlers in api.signals
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination order, see api.pagination.KeysetPagination
+            models.Index(fields=["-created_at", "-id"], name="post_created_id_idx"),
+            # Published posts only; the predicate fixes `published`, so the
+            # index keys start at created_at and also serve keyset pages
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=Q(published=True),
+                name="post_published_created_idx",
+            ),
+            models.Index(
+                fields=["author", "-created_at"], name="post_author_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # comments_count only moves by F() deltas and recounts. Writing back
+        # the value read earlier would undo comments saved in between, so
+        # full saves of existing rows leave it out
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "comments_count"
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Simple comment model for API demonstration"""
@@ -29,6 +79,80 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="comment_created_id_idx"),
+            models.Index(
+                fields=["post", "-created_at", "-id"], name="comment_post_created_idx"
+            ),
+            models.Index(
+                fields=["author", "-created_at"], name="comment_author_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
+
+
+class TableVersion(models.Model):
+    """
+    Per-table change counter used to build cheap HTTP validators.
+
+    Signal handlers in api.signals bump a table's row after every committed
+    write, so comparing versions tells whether any row may have changed
+    without reading or rendering the rows themselves.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def bump(cls, *models_or_labels):
+        """
+        Increment the versions of the given tables in one upsert.
+
+        An UPDATE followed by an INSERT for missing rows would let two
+        transactions both find no row, and one of the first bumps would be
+        lost. ``INSERT ... ON CONFLICT`` needs PostgreSQL or SQLite 3.24+.
+        """
+        labels = list(dict.fromkeys(cls._labels(models_or_labels)))
+        if not labels:
+            return
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        name, version, updated_at = (
+            quote(cls._meta.get_field(field).column)
+            for field in ("name", "version", "updated_at")
+        )
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({name}, {version}, {updated_at}) "
+                f"VALUES {', '.join(['(%s, 1, %s)'] * len(labels))} "
+                f"ON CONFLICT ({name}) DO UPDATE SET "
+                f"{version} = {table}.{version} + 1, "
+                f"{updated_at} = EXCLUDED.{updated_at}",
+                [param for label in labels for param in (label, now)],
+            )
+
+    @classmethod
+    def get_versions(cls, *models_or_labels):
+        """Return {label: (version, updated_at)} in one query; missing tables are 0"""
+        labels = cls._labels(models_or_labels)
+        found = {
+            name: (version, updated_at)
+            for name, version, updated_at in cls.objects.filter(
+                name__in=labels
+            ).values_list("name", "version", "updated_at")
+        }
+        return {label: found.get(label, (0, None)) for label in labels}
+
+    @staticmethod
+    def _labels(models_or_labels):
+        return [
+            item if isinstance(item, str) else item._meta.label_lower
+            for item in models_or_labels
+        ]
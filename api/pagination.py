@@ -0,0 +1,156 @@
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination on ``(created_at, id)``, newest first.
+
+    Unlike DRF's ``CursorPagination``, which filters on the first ordering
+    field and skips ties with an OFFSET, the cursor here carries both keys
+    so every page is a single index range scan with no COUNT and no OFFSET.
+    """
+
+    ordering = ("-created_at", "-id")
+    # Columns a page of `.values()` rows must carry to build cursors
+    values_fields = ("created_at", "id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        position = self.decode_position(self.cursor)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        if reverse:
+            queryset = queryset.order_by("created_at", "id")
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+
+        if position is not None:
+            created_at, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+
+        # Fetch one extra row to learn whether there is a following page
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        return self.page
+
+    def decode_position(self, cursor):
+        if cursor is None or cursor.position is None:
+            return None
+        try:
+            created_at, pk = cursor.position.rsplit("|", 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_position(self, instance):
+        # Pages hold model instances or `.values()` rows
+        if isinstance(instance, dict):
+            created_at, pk = instance["created_at"], instance["id"]
+        else:
+            created_at, pk = instance.created_at, instance.pk
+        return f"{created_at.isoformat()}|{pk}"
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Nothing is newer than the previous cursor, so restart at the top
+            return self.encode_cursor(Cursor(offset=0, reverse=False, position=None))
+        return self.encode_cursor(
+            Cursor(
+                offset=0, reverse=False, position=self.encode_position(self.page[-1])
+            )
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.encode_position(self.page[0]))
+        )
+
+
+class PostCommentPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset pagination on request.
+
+    Existing clients keep getting ``?page=N`` responses with a ``count``.
+    Clients opt into keyset pages with ``?pagination=cursor`` and then follow
+    the opaque ``next``/``previous`` links, which carry a ``cursor`` parameter.
+    """
+
+    mode_query_param = "pagination"
+    keyset_pagination_class = KeysetPagination
+    values_fields = KeysetPagination.values_fields
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == "cursor"
+            or self.keyset_pagination_class.cursor_query_param in params
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.keyset is not None:
+            return self.keyset.get_html_context()
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        keyset = self.keyset_pagination_class()
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 'cursor' to use keyset pagination.",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            },
+            *keyset.get_schema_operation_parameters(view),
+        ]
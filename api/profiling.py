@@ -0,0 +1,147 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.urls import Resolver404, resolve
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this process"""
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of running threads from a background thread.
+
+    Stacks are counted in collapsed form (``thread;module:function;... n``),
+    the input format of flamegraph.pl and speedscope. `threads` restricts
+    sampling to a set of thread idents, which may change while sampling.
+    """
+
+    def __init__(self, interval, threads=None, exclude=()):
+        self.interval = interval
+        self.threads = threads
+        self.exclude = set(exclude)
+        self.stacks = Counter()
+        self.samples = 0
+        self._labels = {}
+        self._thread_names = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return the stack counts"""
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        self.exclude.add(threading.get_ident())
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        self.samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident in self.exclude:
+                continue
+            if self.threads is not None and ident not in self.threads:
+                continue
+            self.stacks[self._collapse(ident, frame)] += 1
+
+    def _collapse(self, ident, frame):
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                module = frame.f_globals.get("__name__", "?")
+                label = self._labels[code] = f"{module}:{code.co_qualname}"
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(self._thread_name(ident))
+        return ";".join(reversed(labels))
+
+    def _thread_name(self, ident):
+        name = self._thread_names.get(ident)
+        if name is None:
+            # Thread pools start threads while sampling runs
+            self._thread_names = {t.ident: t.name for t in threading.enumerate()}
+            name = self._thread_names.get(ident, f"thread-{ident}")
+        return name
+
+
+def collapsed(stacks):
+    """Collapsed-stack text, one ``stack count`` line per distinct stack"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class RequestSampling:
+    """Picks 1 in `every` requests to `route` for `ProfilingMiddleware`"""
+
+    def __init__(self, route, every):
+        self.route = route
+        self.every = every
+        self.threads = set()
+        self.requests = 0
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    def claim(self, request):
+        try:
+            match = resolve(request.path_info, getattr(request, "urlconf", None))
+        except Resolver404:
+            return False
+        if match.view_name != self.route:
+            return False
+        with self._lock:
+            self._seen += 1
+            if (self._seen - 1) % self.every:
+                return False
+            self.requests += 1
+            return True
+
+
+_profile_lock = threading.Lock()
+# Checked by ProfilingMiddleware on every request; set while a route profile runs
+active_sampling = None
+
+
+def profile(seconds, interval, route=None, every=1):
+    """
+    Sample this process for `seconds`; returns the profiler and the
+    `RequestSampling` used, if any.
+
+    Without `route` every thread is sampled: request threads, the event loop
+    running consumers and sync_to_async workers. With `route` only the
+    threads handling 1 in `every` matching requests are. Raises `ProfilerBusy`
+    if a profile is already running.
+    """
+    global active_sampling
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        sampling = RequestSampling(route, every) if route else None
+        profiler = SamplingProfiler(
+            interval,
+            threads=sampling.threads if sampling else None,
+            # The caller only sleeps
+            exclude=[threading.get_ident()],
+        )
+        profiler.start()
+        active_sampling = sampling
+        try:
+            time.sleep(seconds)
+        finally:
+            active_sampling = None
+            profiler.stop()
+        return profiler, sampling
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,204 @@
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of single database queries",
+    ["endpoint"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Database queries run by one request",
+    ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Total database time of one request",
+    ["endpoint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """SQL with literals and parameters replaced, so similar queries group"""
+    sql = _LITERALS.sub("?", sql).replace("%s", "?")
+    sql = _PLACEHOLDER_LISTS.sub("(...)", sql)
+    sql = _REPEATED_LISTS.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def route_name(request):
+    """Metric label for a request: its URL name, or "unmatched" """
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "unmatched"
+
+
+class QueryStats:
+    """Queries run while handling one request"""
+
+    __slots__ = ("request", "count", "duration")
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.duration = 0.0
+
+
+# Copied into the threads sync_to_async runs ORM code in, so queries of async
+# requests are attributed as well
+_current_stats = ContextVar("query_stats", default=None)
+
+
+def start_request(request):
+    """Attribute queries in the current context to `request` until `finish`"""
+    stats = QueryStats(request)
+    return stats, _current_stats.set(stats)
+
+
+def finish_request(stats, token):
+    _current_stats.reset(token)
+    endpoint = route_name(stats.request)
+    DB_QUERIES_PER_REQUEST.labels(endpoint).observe(stats.count)
+    DB_TIME_PER_REQUEST.labels(endpoint).observe(stats.duration)
+
+
+def instrument_query(execute, sql, params, many, context):
+    """Execute wrapper timing queries run on behalf of a request"""
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        result = execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        stats.count += 1
+        stats.duration += duration
+        DB_QUERY_DURATION.labels(route_name(stats.request)).observe(duration)
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if 0 < threshold <= duration:
+        _record_slow_query(stats, sql, params, many, context, duration)
+    return result
+
+
+def install_query_instrumentation(sender, connection, **kwargs):
+    """
+    `connection_created` receiver adding `instrument_query` to new connections.
+
+    A per-request ``connection.execute_wrapper()`` block would only cover the
+    calling thread's connection, while async requests run their queries on
+    worker threads. Inserting at the front keeps the stack that
+    ``execute_wrapper()`` blocks push and pop intact across reconnects.
+    """
+    if instrument_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, instrument_query)
+
+
+def _record_slow_query(stats, sql, params, many, context, duration):
+    statement = normalize_sql(sql)
+    endpoint = route_name(stats.request)
+    logger.warning(
+        "Slow query (%.1f ms) in %s: %s", duration * 1000, endpoint, statement
+    )
+    if many or not sql.lstrip()[:6].upper() == "SELECT":
+        return
+    if not slow_queries.wants(statement, duration):
+        return
+    slow_queries.add(
+        {
+            "statement": statement,
+            "duration_ms": round(duration * 1000, 3),
+            "endpoint": endpoint,
+            "plan": explain(context["connection"], sql, params),
+            "captured_at": time.time(),
+        }
+    )
+
+
+def explain(connection, sql, params):
+    """The database's plan for `sql`, or an error message"""
+    # Neither counted nor explained itself
+    token = _current_stats.set(None)
+    try:
+        # A savepoint keeps a failed EXPLAIN from breaking the transaction
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                prefix = connection.ops.explain_query_prefix()
+                cursor.execute(f"{prefix} {sql}", params)
+                rows = cursor.fetchall()
+    except Exception as e:
+        return f"Error: {e}"
+    finally:
+        _current_stats.reset(token)
+    return "\n".join(
+        row if isinstance(row, str) else " ".join(str(c) for c in row) for row in rows
+    )
+
+
+class SlowQueryLog:
+    """
+    The slowest distinct statements seen by this process, with their plans.
+
+    Holds at most ``SLOW_QUERY_EXPLAIN_SIZE`` statements; a statement is only
+    explained again when it runs slower than its recorded entry.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return settings.SLOW_QUERY_EXPLAIN_SIZE
+
+    def wants(self, statement, duration):
+        """Whether a run of `statement` taking `duration` would be kept"""
+        duration_ms = duration * 1000
+        with self._lock:
+            entry = self._entries.get(statement)
+            if entry is not None:
+                return duration_ms > entry["duration_ms"]
+            if len(self._entries) < self.size:
+                return True
+            return self.size > 0 and duration_ms > self._fastest()["duration_ms"]
+
+    def add(self, entry):
+        with self._lock:
+            current = self._entries.get(entry["statement"])
+            if current is not None and current["duration_ms"] >= entry["duration_ms"]:
+                return
+            self._entries[entry["statement"]] = entry
+            while len(self._entries) > self.size:
+                del self._entries[self._fastest()["statement"]]
+
+    def entries(self):
+        """Entries from slowest to fastest"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return sorted(entries, key=lambda e: e["duration_ms"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _fastest(self):
+        return min(self._entries.values(), key=lambda e: e["duration_ms"])
+
+
+slow_queries = SlowQueryLog()
@@ -0,0 +1,131 @@
+import codecs
+
+import msgpack
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+
+_drf_encoder = JSONEncoder()
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder so they keep its millisecond/"Z" format
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data):
+    """Encode `data` to JSON bytes the way DRF's JSONRenderer does, only faster"""
+    if orjson is not None:
+        try:
+            ret = orjson.dumps(
+                data, default=_drf_encoder.default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits; let the stdlib encoder decide
+            pass
+        else:
+            # Keep the output a strict JavaScript subset, as DRF does
+            if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+                ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                    b"\xe2\x80\xa9", b"\\u2029"
+                )
+            return ret
+    return JSONRenderer().render(data)
+
+
+def packb(data):
+    """Encode `data` to MessagePack, rendering non-native types like the JSON API"""
+    return msgpack.packb(data, default=_drf_encoder.default, use_bin_type=True)
+
+
+def unpackb(data):
+    return msgpack.unpackb(data, raw=False)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson.
+
+    Compact responses are encoded with orjson; indented output (the browsable
+    API, ``Accept: application/json; indent=4``) and non-default JSON settings
+    fall back to the stdlib implementation.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson for UTF-8 request bodies"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders responses as MessagePack.
+
+    Selected with ``Accept: application/msgpack``, ``?format=msgpack`` or a
+    ``.msgpack`` URL suffix. Datetimes, decimals and other non-native values
+    are rendered exactly as in JSON responses.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return packb(data)
+
+
+class MessagePackParser(BaseParser):
+    """Parses MessagePack request bodies"""
+
+    media_type = "application/msgpack"
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return unpackb(stream.read())
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError("MessagePack parse error - %s" % str(exc))
+
+
+class FastJsonResponse(HttpResponse):
+    """Drop-in JsonResponse that encodes with the API's JSON encoder"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
@@ -1,10 +1,48 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
 from .models import Comment, Post
 
 
-class UserSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Accepts a `fields` argument limiting which fields are rendered"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that looks instances up in
+    ``context["related_instances"][field_name]`` when a bulk view loaded them
+    for the whole payload, instead of running one query per item.
+    """
+
+    def to_internal_value(self, data):
+        instances = self.context.get("related_instances", {}).get(self.field_name)
+        if instances is None:
+            return super().to_internal_value(data)
+        try:
+            # As in PrimaryKeyRelatedField, True is not the primary key 1
+            if isinstance(data, bool):
+                raise TypeError
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return instances[pk]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """User serializer for API responses"""
 
     class Meta:
@@ -13,9 +51,10 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Comment serializer with nested author info"""
 
+    post = PrefetchedPrimaryKeyRelatedField(queryset=Post.objects.all())
     author = UserSerializer(read_only=True)
     author_id = serializers.IntegerField(write_only=True, required=False)
 
@@ -25,13 +64,13 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at"]
 
 
-class PostSerializer(serializers.ModelSerializer):
-    """Post serializer with nested author and comments"""
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Post serializer with nested author and its newest comments"""
 
     author = UserSerializer(read_only=True)
     author_id = serializers.IntegerField(write_only=True, required=False)
-    comments = CommentSerializer(many=True, read_only=True)
-    comments_count = serializers.SerializerMethodField()
+    comments = serializers.SerializerMethodField()
+    comments_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
@@ -46,18 +85,30 @@ class PostSerializer(serializers.ModelSerializer):
             "published",
             "comments",
             "comments_count",
+            "comments_url",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        read_only_fields = ["id", "created_at", "updated_at", "comments_count"]
 
-    def get_comments_count(self, obj) -> int:
-        return obj.comments.count()
+    @extend_schema_field(CommentSerializer(many=True))
+    def get_comments(self, obj):
+        # PostViewSet prefetches the bounded list into `recent_comments`
+        comments = getattr(obj, "recent_comments", None)
+        if comments is None:
+            comments = obj.comments.select_related("author")[
+                : settings.POST_DETAIL_COMMENTS_LIMIT
+            ]
+        return CommentSerializer(comments, many=True, context=self.context).data
 
+    def get_comments_url(self, obj) -> str:
+        return reverse(
+            "post-comments", kwargs={"pk": obj.pk}, request=self.context.get("request")
+        )
 
-class PostListSerializer(serializers.ModelSerializer):
+
+class PostListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Simplified serializer for post list view"""
 
     author = UserSerializer(read_only=True)
-    comments_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
@@ -70,7 +121,4 @@ class PostListSerializer(serializers.ModelSerializer):
             "published",
             "comments_count",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
-
-    def get_comments_count(self, obj) -> int:
-        return obj.comments.count()
+        read_only_fields = ["id", "created_at", "updated_at", "comments_count"]
@@ -0,0 +1,116 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Comment, Post, TableVersion
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_post(sender, instance, raw=False, **kwargs):
+    """Record the post a comment belonged to before it is saved"""
+    if raw or instance._state.adding or instance.pk is None:
+        instance._previous_post_id = None
+        return
+    instance._previous_post_id = (
+        Comment.objects.filter(pk=instance.pk).values_list("post_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, raw=False, **kwargs):
+    """Keep Post.comments_count in step with new and moved comments"""
+    if raw:
+        return
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F("comments_count") + 1
+        )
+        return
+    previous_post_id = getattr(instance, "_previous_post_id", None)
+    if previous_post_id is not None and previous_post_id != instance.post_id:
+        Post.objects.filter(pk=previous_post_id, comments_count__gt=0).update(
+            comments_count=F("comments_count") - 1
+        )
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F("comments_count") + 1
+        )
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post(sender, instance, origin=None, **kwargs):
+    """Note posts deleted by the cascade of `origin`, before their comments go"""
+    if origin is not None:
+        origin.__dict__.setdefault("_deleted_post_ids", set()).add(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, origin=None, **kwargs):
+    """Decrement Post.comments_count, including for cascaded deletes"""
+    # The counter of a post deleted in the same cascade is going away as well
+    if instance.post_id in getattr(origin, "_deleted_post_ids", ()):
+        return
+    Post.objects.filter(pk=instance.post_id, comments_count__gt=0).update(
+        comments_count=F("comments_count") - 1
+    )
+
+
+class PendingVersionBumps:
+    """The on_commit callback bumping every table written in a transaction"""
+
+    def __init__(self):
+        self.models = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        # A fixed order keeps concurrent commits from deadlocking on the rows
+        TableVersion.bump(*sorted(self.models, key=lambda m: m._meta.label_lower))
+
+
+def bump_table_versions(*models):
+    """Bump the TableVersion rows of `models` once the transaction commits"""
+    # Deferring keeps the hot counter rows locked only for a single UPDATE
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        TableVersion.bump(*models)
+        return
+    # One callback per transaction, however many rows change. A savepoint
+    # rollback drops it with its other callbacks; the next write adds another
+    pending = next(
+        (
+            func
+            for _, func, _ in connection.run_on_commit
+            if isinstance(func, PendingVersionBumps) and not func.done
+        ),
+        None,
+    )
+    if pending is None:
+        pending = PendingVersionBumps()
+        transaction.on_commit(pending)
+    pending.models.update(models)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_table_versions(Post)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, raw=False, **kwargs):
+    # Comment writes also change Post.comments_count
+    if not raw:
+        bump_table_versions(Comment, Post)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, raw=False, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the API never renders
+    if raw or (update_fields and set(update_fields) == {"last_login"}):
+        return
+    bump_table_versions(User)
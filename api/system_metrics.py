@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+import psutil
+from django.conf import settings
+
+
+class PeriodicSampler:
+    """
+    Runs `sample()` on a background thread every ``interval_setting`` seconds.
+
+    Readers get the latest snapshot without blocking. Each process starts its
+    own thread on first use (after a fork as well). An interval of 0 disables
+    the thread and samples inline on every read.
+    """
+
+    interval_setting = None
+    thread_name = "sampler"
+    # Take the first background sample immediately instead of after an interval
+    sample_on_start = False
+
+    def __init__(self):
+        # Replaced wholesale by the sampler thread, so reads need no lock
+        self._snapshot = None
+        self._pid = None
+        self._stop = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def interval(self):
+        return getattr(settings, self.interval_setting)
+
+    def snapshot(self):
+        """Return the latest sample"""
+        if self.interval <= 0:
+            return self.sample()
+        self._ensure_running()
+        snapshot = self._snapshot
+        if snapshot is None:
+            # The first background sample is still an interval away
+            return self.sample()
+        return snapshot
+
+    def sample(self):
+        raise NotImplementedError
+
+    def background_sample(self):
+        """Sample taken on the background thread; defaults to `sample()`"""
+        return self.sample()
+
+    def on_start(self):
+        """Hook run in the reading thread before the sampler thread starts"""
+
+    def _ensure_running(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            # A snapshot inherited over fork describes the parent's past
+            self._snapshot = None
+            self.on_start()
+            self._stop = threading.Event()
+            threading.Thread(
+                target=self._run,
+                args=(self.interval, self._stop),
+                name=self.thread_name,
+                daemon=True,
+            ).start()
+            self._pid = pid
+
+    def _run(self, interval, stop):
+        if self.sample_on_start:
+            self._snapshot = self.background_sample()
+        while not stop.wait(interval):
+            self._snapshot = self.background_sample()
+
+    def stop(self):
+        """Stop the sampler thread of this process; the next read restarts it"""
+        with self._start_lock:
+            if self._stop is not None:
+                self._stop.set()
+            self._pid = None
+
+
+class SystemMetricsSampler(PeriodicSampler):
+    """
+    Samples CPU, memory and disk usage in the background.
+
+    CPU usage is averaged over the sampling interval instead of being
+    measured per request. Snapshots carry an "error" key when sampling fails.
+    """
+
+    interval_setting = "SYSTEM_METRICS_INTERVAL"
+    thread_name = "system-metrics-sampler"
+
+    def sample(self):
+        try:
+            return {
+                "cpu_percent": psutil.cpu_percent(),
+                "memory_percent": psutil.virtual_memory().percent,
+                "disk_percent": psutil.disk_usage("/").percent,
+                "sampled_at": time.time(),
+            }
+        except Exception as e:
+            return {"error": str(e), "sampled_at": time.time()}
+
+    def on_start(self):
+        # Start the CPU measurement window the first sample reports on
+        psutil.cpu_percent()
+
+
+system_metrics = SystemMetricsSampler()
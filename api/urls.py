@@ -17,6 +17,8 @@ router.register(r"users", views.UserViewSet)
 urlpatterns = [
     # REST API endpoints
     path("v1/", include(router.urls)),
+    path("v1/debug/slow-queries/", views.slow_query_log, name="debug-slow-queries"),
+    path("v1/debug/profile/", views.profile_process, name="debug-profile"),
     path("auth/", include("rest_framework.urls")),  # Browsable API login/logout
     # API Documentation
     path("schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -1,28 +1,95 @@
+import os
 import socket
 import time
 from datetime import datetime
+from functools import lru_cache
 
-import psutil
-from django.db import connection
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 from prometheus_client import (
     CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
     Counter,
     Gauge,
     Histogram,
     generate_latest,
+    multiprocess,
 )
 
-# Prometheus metrics
+from .health import get_status_data
+from .renderers import FastJsonResponse
+from .system_metrics import system_metrics
+
+# Prometheus metrics; the request metrics are recorded by
+# api.middleware.RequestMetricsMiddleware, labelled by URL route name
 REQUEST_COUNT = Counter(
-    "http_requests_total", "Total HTTP requests", ["method", "endpoint"]
+    "http_requests_total", "Total HTTP requests", ["method", "endpoint", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration",
+    ["method", "endpoint"],
+    # Most API responses take a few milliseconds; the tail matters up to seconds
+    buckets=(
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    ),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size",
+    ["method", "endpoint"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+# Gauge modes only apply in multiprocess mode: connections add up across live
+# workers, host-wide readings take the latest value of any live worker
+ACTIVE_CONNECTIONS = Gauge(
+    "active_connections",
+    "HTTP requests currently in flight",
+    multiprocess_mode="livesum",
+)
+CPU_USAGE = Gauge(
+    "cpu_usage_percent", "CPU usage percentage", multiprocess_mode="livemostrecent"
 )
-REQUEST_DURATION = Histogram("http_request_duration_seconds", "HTTP request duration")
-ACTIVE_CONNECTIONS = Gauge("active_connections", "Number of active connections")
-CPU_USAGE = Gauge("cpu_usage_percent", "CPU usage percentage")
-MEMORY_USAGE = Gauge("memory_usage_percent", "Memory usage percentage")
+MEMORY_USAGE = Gauge(
+    "memory_usage_percent",
+    "Memory usage percentage",
+    multiprocess_mode="livemostrecent",
+)
+
+
+@lru_cache
+def _multiprocess_registry(path):
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return registry
+
+
+def get_metrics_registry():
+    """
+    Registry served by /prometheus/.
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set (see config/gunicorn.conf.py) every
+    worker writes its metrics to files in that directory, and one registry per
+    process merges them on each scrape. Otherwise this process's registry.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        return _multiprocess_registry(path)
+    return REGISTRY
 
 
 @require_http_methods(["GET", "HEAD"])
@@ -38,7 +105,7 @@ def ws_test(request):
 
 @require_http_methods(["GET", "HEAD"])
 def health_check(request):
-    return JsonResponse(
+    return FastJsonResponse(
         {
             "status": "healthy",
             "hostname": socket.gethostname(),
@@ -51,7 +118,7 @@ def health_check(request):
 
 @require_http_methods(["GET"])
 def api_root(request):
-    return JsonResponse(
+    return FastJsonResponse(
         {
             "message": "Welcome to MyApp API",
             "version": "1.0.0",
@@ -82,60 +149,43 @@ def api_root(request):
 
 @require_http_methods(["GET"])
 def status(request):
-    try:
-        # Test database connection
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-        db_status = "Connected"
-    except Exception as e:
-        db_status = f"Error: {str(e)[:50]}"
-
-    status_data = {
-        "application": "healthy",
-        "database": db_status,
-        "hostname": socket.gethostname(),
-        "timestamp": datetime.now().isoformat(),
-    }
+    # Cached prober results; polling this view never touches the database
+    status_data = get_status_data()
 
     # Return HTML for HTMX, JSON for API
     if request.headers.get("HX-Request"):
         return render(request, "status.html", {"status": status_data})
-    return JsonResponse(status_data)
+    return FastJsonResponse(status_data)
 
 
 @require_http_methods(["GET"])
 def metrics(request):
-    try:
-        # Get basic system metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage("/")
-
-        metrics_data = {
-            "cpu_percent": cpu_percent,
-            "memory_percent": memory.percent,
-            "disk_percent": disk.percent,
-            "hostname": socket.gethostname(),
-            "timestamp": datetime.now().isoformat(),
-        }
-
-        # Return HTML for HTMX, JSON for API
-        if request.headers.get("HX-Request"):
-            return render(request, "metrics.html", {"metrics": metrics_data})
-        return JsonResponse(metrics_data)
-    except Exception as e:
+    # Served from the background sampler's latest snapshot, never blocks
+    snapshot = system_metrics.snapshot()
+    if "error" in snapshot:
         error_data = {
-            "error": str(e),
+            "error": snapshot["error"],
             "hostname": socket.gethostname(),
             "timestamp": datetime.now().isoformat(),
         }
-        return JsonResponse(error_data)
+        return FastJsonResponse(error_data)
+
+    metrics_data = {
+        "cpu_percent": snapshot["cpu_percent"],
+        "memory_percent": snapshot["memory_percent"],
+        "disk_percent": snapshot["disk_percent"],
+        "hostname": socket.gethostname(),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+    # Return HTML for HTMX, JSON for API
+    if request.headers.get("HX-Request"):
+        return render(request, "metrics.html", {"metrics": metrics_data})
+    return FastJsonResponse(metrics_data)
 
 
 @require_http_methods(["GET"])
 def demo_lb(request):
-    REQUEST_COUNT.labels(method="GET", endpoint="demo_lb").inc()
-
     lb_data = {
         "request_id": int(time.time() * 1000),
         "hostname": socket.gethostname(),
@@ -146,73 +196,144 @@ def demo_lb(request):
     # Return HTML for HTMX, JSON for API
     if request.headers.get("HX-Request"):
         return render(request, "demo_lb.html", {"lb": lb_data})
-    return JsonResponse(lb_data)
+    return FastJsonResponse(lb_data)
 
 
 @require_http_methods(["GET"])
 def prometheus_metrics(request):
-    # Update metrics
-    try:
-        cpu_percent = psutil.cpu_percent()
-        memory_percent = psutil.virtual_memory().percent
-        CPU_USAGE.set(cpu_percent)
-        MEMORY_USAGE.set(memory_percent)
-    except:
-        pass
-
-    REQUEST_COUNT.labels(method="GET", endpoint="prometheus_metrics").inc()
+    # Update metrics from the background sampler
+    snapshot = system_metrics.snapshot()
+    if "error" not in snapshot:
+        CPU_USAGE.set(snapshot["cpu_percent"])
+        MEMORY_USAGE.set(snapshot["memory_percent"])
+
+    return HttpResponse(
+        generate_latest(get_metrics_registry()), content_type=CONTENT_TYPE_LATEST
+    )
 
-    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
 
+from collections import defaultdict
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Prefetch
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    extend_schema,
+    inline_serializer,
+)
 
 # REST API ViewSets
-from rest_framework import permissions
+from rest_framework import permissions, serializers
 from rest_framework import status as drf_status
 from rest_framework import viewsets
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 
+from .fast_serializers import (
+    fast_comment_serializer,
+    fast_post_list_serializer,
+    fast_user_serializer,
+)
+from .mixins import (
+    BulkCreateMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    SparseFieldsetMixin,
+    ValuesListMixin,
+)
 from .models import Comment, Post
+from .pagination import KeysetPagination, PostCommentPagination
 from .permissions import IsOwnerOrReadOnly
+from .profiling import ProfilerBusy, collapsed, profile
+from .queries import slow_queries
 from .serializers import (
     CommentSerializer,
     PostListSerializer,
     PostSerializer,
     UserSerializer,
 )
+from .signals import bump_table_versions
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(
+    BulkCreateMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    SparseFieldsetMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     """
     Simple CRUD API for blog posts
 
     Available endpoints:
     - GET /api/v1/posts/ - List all posts
-    - POST /api/v1/posts/ - Create a new post
+    - POST /api/v1/posts/ - Create a new post, or several from a list
+    - POST /api/v1/posts/bulk/ - Create posts from a list
     - GET /api/v1/posts/{id}/ - Get a specific post
     - PUT/PATCH /api/v1/posts/{id}/ - Update a post
     - DELETE /api/v1/posts/{id}/ - Delete a post
+    - GET /api/v1/posts/{id}/comments/ - List a post's comments (cursor paginated)
     """
 
     queryset = Post.objects.all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    pagination_class = PostCommentPagination
+    fast_list_serializer = fast_post_list_serializer
+    version_models = (Post, Comment, User)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "comments":
+            # Only the post's existence and permissions are checked
+            return queryset.only("id", "author_id")
+        if self.includes_field("author"):
+            queryset = queryset.select_related("author")
+        if self.action in ("retrieve", "update", "partial_update") and (
+            self.includes_field("comments")
+        ):
+            # Detail responses embed only the newest comments, each with its author
+            recent_comments = Comment.objects.select_related("author")[
+                : settings.POST_DETAIL_COMMENTS_LIMIT
+            ]
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "comments", queryset=recent_comments, to_attr="recent_comments"
+                )
+            )
+        return self.project_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action == "list":
             return PostListSerializer
+        if self.action == "comments":
+            return CommentSerializer
         return PostSerializer
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        # A new post has no comments to embed
+        post.recent_comments = []
+
+    def bulk_instance(self, validated_data):
+        validated_data.pop("author_id", None)
+        post = Post(**validated_data, author=self.request.user)
+        # A new post has no comments to embed
+        post.recent_comments = []
+        return post
+
+    def after_bulk_create(self, instances):
+        bump_table_versions(Post)
 
     @action(detail=True, methods=["post"])
     def publish(self, request, pk=None):
         """Publish a post"""
         post = self.get_object()
         post.published = True
-        post.save()
+        post.save(update_fields=["published", "updated_at"])
         return Response({"status": "post published"})
 
     @action(detail=True, methods=["post"])
@@ -220,17 +341,36 @@ class PostViewSet(viewsets.ModelViewSet):
         """Unpublish a post"""
         post = self.get_object()
         post.published = False
-        post.save()
+        post.save(update_fields=["published", "updated_at"])
         return Response({"status": "post unpublished"})
 
-
-class CommentViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=["get"], pagination_class=KeysetPagination)
+    def comments(self, request, pk=None):
+        """List a post's comments, newest first"""
+        post = self.get_object()
+        queryset = Comment.objects.filter(post=post)
+        if self.includes_field("author"):
+            queryset = queryset.select_related("author")
+        page = self.paginate_queryset(self.project_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class CommentViewSet(
+    BulkCreateMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    SparseFieldsetMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     """
     Simple CRUD API for comments
 
     Available endpoints:
     - GET /api/v1/comments/ - List all comments
-    - POST /api/v1/comments/ - Create a new comment
+    - POST /api/v1/comments/ - Create a new comment, or several from a list
+    - POST /api/v1/comments/bulk/ - Create comments from a list
     - GET /api/v1/comments/{id}/ - Get a specific comment
     - PUT/PATCH /api/v1/comments/{id}/ - Update a comment
     - DELETE /api/v1/comments/{id}/ - Delete a comment
@@ -239,12 +379,58 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
-
+    pagination_class = PostCommentPagination
+    fast_list_serializer = fast_comment_serializer
+    version_models = (Comment, User)
+    bulk_related_fields = ("post",)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.includes_field("author"):
+            queryset = queryset.select_related("author")
+        return self.project_queryset(queryset)
+
+    def bulk_instance(self, validated_data):
+        validated_data.pop("author_id", None)
+        return Comment(**validated_data, author=self.request.user)
+
+    def after_bulk_create(self, instances):
+        # The signal handlers would have added 1 per comment. Add each post's
+        # total instead, one UPDATE per distinct total; deltas, unlike a
+        # recount, cannot lose comments committed concurrently
+        added = defaultdict(int)
+        for comment in instances:
+            added[comment.post_id] += 1
+        posts_by_total = defaultdict(list)
+        for post_id, total in added.items():
+            posts_by_total[total].append(post_id)
+        for total, post_ids in posts_by_total.items():
+            Post.objects.filter(pk__in=post_ids).update(
+                comments_count=F("comments_count") + total
+            )
+        bump_table_versions(Comment, Post)
+
+    # Post.comments_count is updated by signal handlers; keep both writes atomic
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+
+class UserViewSet(
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    SparseFieldsetMixin,
+    ValuesListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """
     Read-only API for users
 
@@ -253,6 +439,117 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     - GET /api/v1/users/{id}/ - Get a specific user
     """
 
-    queryset = User.objects.all()
+    queryset = User.objects.order_by("id")
     serializer_class = UserSerializer
+    fast_list_serializer = fast_user_serializer
+    version_models = (User,)
     permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        return self.project_queryset(super().get_queryset())
+
+
+@extend_schema(
+    responses=inline_serializer(
+        "SlowQueryLog",
+        {
+            "hostname": serializers.CharField(),
+            "pid": serializers.IntegerField(),
+            "threshold_ms": serializers.FloatField(),
+            "queries": inline_serializer(
+                "SlowQuery",
+                {
+                    "statement": serializers.CharField(),
+                    "duration_ms": serializers.FloatField(),
+                    "endpoint": serializers.CharField(),
+                    "plan": serializers.CharField(),
+                    "captured_at": serializers.FloatField(),
+                },
+                many=True,
+            ),
+        },
+    )
+)
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def slow_query_log(request):
+    """
+    Slowest distinct queries seen by the serving process, with their plans.
+
+    Each worker keeps its own log; repeat the request to sample others.
+    """
+    return Response(
+        {
+            "hostname": socket.gethostname(),
+            "pid": os.getpid(),
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD * 1000,
+            "queries": slow_queries.entries(),
+        }
+    )
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("seconds", OpenApiTypes.FLOAT),
+        OpenApiParameter("interval", OpenApiTypes.FLOAT),
+        OpenApiParameter("route", OpenApiTypes.STR),
+        OpenApiParameter("every", OpenApiTypes.INT),
+    ],
+    responses={
+        (200, "text/plain"): OpenApiTypes.STR,
+        400: OpenApiTypes.OBJECT,
+        409: OpenApiTypes.OBJECT,
+    },
+)
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def profile_process(request):
+    """
+    Sample the serving process and return collapsed stacks.
+
+    Query parameters: ``seconds`` to sample (default 10, at most
+    ``PROFILER_MAX_SECONDS``, which stays below the Gunicorn worker timeout
+    ``WORKER_TIMEOUT``) and ``interval`` between samples. With ``route`` (a
+    URL name such as ``post-list``) only 1 in ``every`` matching requests are
+    sampled. Blocks for the whole run; feed the output to flamegraph.pl or
+    speedscope.
+    """
+    try:
+        seconds = float(request.query_params.get("seconds", 10))
+        interval = float(
+            request.query_params.get("interval", settings.PROFILER_INTERVAL)
+        )
+        every = int(request.query_params.get("every", 1))
+    except ValueError:
+        return Response(
+            {"detail": "seconds, interval and every must be numbers."},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+    if not 0 < seconds <= settings.PROFILER_MAX_SECONDS:
+        return Response(
+            {"detail": f"seconds must be in (0, {settings.PROFILER_MAX_SECONDS}]."},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+    if interval < 0.001 or every < 1:
+        return Response(
+            {"detail": "interval must be at least 0.001 and every at least 1."},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        profiler, sampling = profile(
+            seconds, interval, route=request.query_params.get("route"), every=every
+        )
+    except ProfilerBusy:
+        return Response(
+            {"detail": "A profile is already running in this process."},
+            status=drf_status.HTTP_409_CONFLICT,
+        )
+    response = HttpResponse(
+        collapsed(profiler.stacks), content_type="text/plain; charset=utf-8"
+    )
+    response["X-Profile-Host"] = f"{socket.gethostname()}:{os.getpid()}"
+    response["X-Profile-Samples"] = profiler.samples
+    if sampling is not None:
+        response["X-Profile-Requests"] = sampling.requests
+    return response
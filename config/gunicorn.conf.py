@@ -0,0 +1,38 @@
+"""
+Gunicorn settings for running several ASGI workers per pod:
+
+    gunicorn config.asgi:application -c config/gunicorn.conf.py
+
+Daphne (the image default) runs a single process and needs none of this.
+"""
+
+import os
+import shutil
+
+from decouple import config
+
+bind = "0.0.0.0:8000"
+workers = config("WEB_CONCURRENCY", default=2, cast=int)
+worker_class = "uvicorn.workers.UvicornWorker"
+# PROFILER_MAX_SECONDS stays below this, see config/settings/base.py
+timeout = config("WORKER_TIMEOUT", default=30, cast=int)
+
+# Workers write their Prometheus metrics to files here (the /app/tmp emptyDir
+# in Kubernetes) and /prometheus/ aggregates them. Set before workers import
+# prometheus_client, which picks its storage at import time.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/app/tmp/prometheus"
+)
+
+
+def on_starting(server):
+    # The emptyDir outlives container restarts; stale files would be re-counted
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drop the live gauges of the exited worker; its counters keep counting
+    multiprocess.mark_process_dead(worker.pid)
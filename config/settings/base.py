@@ -27,6 +27,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
+    "api.middleware.QueryMetricsMiddleware",
+    "api.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -107,9 +110,17 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
+    # Environments pick their renderer/parser profile, see local, test and
+    # production settings
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
-        "rest_framework.renderers.BrowsableAPIRenderer",
+        "api.renderers.MessagePackRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "api.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
@@ -117,8 +128,72 @@ REST_FRAMEWORK = {
         "rest_framework.throttling.UserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
-        "anon": "100/hour",
-        "user": "1000/hour",
+        "anon": config("THROTTLE_RATE_ANON", default="100/hour"),
+        "user": config("THROTTLE_RATE_USER", default="1000/hour"),
+    },
+}
+
+# API tuning
+# Newest comments embedded in a post detail response; the rest are served by
+# the paginated /api/v1/posts/{id}/comments/ action
+POST_DETAIL_COMMENTS_LIMIT = config("POST_DETAIL_COMMENTS_LIMIT", default=5, cast=int)
+# Seconds a rendered list/detail response stays cached; 0 disables the cache.
+# Keys are versioned by table, so this only bounds how long dead entries linger
+API_CACHE_TIMEOUT = config("API_CACHE_TIMEOUT", default=300, cast=int)
+# Longest list accepted by the bulk create endpoints of posts and comments
+BULK_CREATE_MAX_ITEMS = config("BULK_CREATE_MAX_ITEMS", default=1000, cast=int)
+
+# Seconds between background CPU/memory/disk samples behind /metrics/,
+# /prometheus/ and the metrics socket; 0 samples inline on every read
+SYSTEM_METRICS_INTERVAL = config("SYSTEM_METRICS_INTERVAL", default=2.0, cast=float)
+# Seconds between metrics frames broadcast to /ws/metrics/ clients
+METRICS_BROADCAST_INTERVAL = config(
+    "METRICS_BROADCAST_INTERVAL", default=5.0, cast=float
+)
+# Seconds between database/channel layer health checks behind /status/ and
+# the status socket, and the time each check may take; 0 checks inline
+HEALTH_CHECK_INTERVAL = config("HEALTH_CHECK_INTERVAL", default=5.0, cast=float)
+HEALTH_CHECK_TIMEOUT = config("HEALTH_CHECK_TIMEOUT", default=2.0, cast=float)
+# Seconds between status frames broadcast to /ws/status/ clients
+STATUS_BROADCAST_INTERVAL = config(
+    "STATUS_BROADCAST_INTERVAL", default=10.0, cast=float
+)
+# Seconds after which a request's query is logged as slow; 0 disables the log
+SLOW_QUERY_THRESHOLD = config("SLOW_QUERY_THRESHOLD", default=0.2, cast=float)
+# Distinct slow SELECTs kept with their EXPLAIN plan for
+# /api/v1/debug/slow-queries/; 0 runs no EXPLAIN
+SLOW_QUERY_EXPLAIN_SIZE = config("SLOW_QUERY_EXPLAIN_SIZE", default=0, cast=int)
+# Seconds Gunicorn lets a worker go silent before killing it; read by
+# config/gunicorn.conf.py as well
+WORKER_TIMEOUT = config("WORKER_TIMEOUT", default=30, cast=int)
+# Longest run and default sampling interval, in seconds, of
+# /api/v1/debug/profile/. A run blocks its request, so it is capped 5s short
+# of WORKER_TIMEOUT
+PROFILER_MAX_SECONDS = min(
+    config("PROFILER_MAX_SECONDS", default=20, cast=int), WORKER_TIMEOUT - 5
+)
+PROFILER_INTERVAL = config("PROFILER_INTERVAL", default=0.01, cast=float)
+
+# "default" is shared by all workers (DRF throttle counters among others);
+# "api" keeps hot API responses in process memory in front of it
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config(
+            "CACHE_URL", default=config("REDIS_URL", default="redis://localhost:6379")
+        ),
+    },
+    "api": {
+        "BACKEND": "api.cache.TwoTierCache",
+        "LOCATION": "api",
+        "TIMEOUT": API_CACHE_TIMEOUT,
+        "OPTIONS": {
+            "REMOTE": "default",
+            "LOCAL_TIMEOUT": config("API_CACHE_LOCAL_TIMEOUT", default=5, cast=int),
+            "LOCAL_MAX_ENTRIES": config(
+                "API_CACHE_LOCAL_MAX_ENTRIES", default=1000, cast=int
+            ),
+        },
     },
 }
 
@@ -12,3 +12,28 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
 # Use in-memory channel layer for development (no Redis required)
 CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+# Use local memory cache for development (no Redis required)
+CACHES = {
+    **CACHES,
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+# Explain slow queries for /api/v1/debug/slow-queries/
+SLOW_QUERY_EXPLAIN_SIZE = 20
+
+# Production JSON renderer/parser plus the browsable API
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "api.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "api.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
@@ -15,3 +15,32 @@ CSRF_COOKIE_SECURE = False
 
 # Use in-memory channel layer for tests
 CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+# Use local memory cache for tests
+CACHES = {
+    **CACHES,
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+# Table versions roll back between tests while cached responses would not
+API_CACHE_TIMEOUT = 0
+
+# Sample and probe inline so tests can patch psutil and the database
+SYSTEM_METRICS_INTERVAL = 0
+HEALTH_CHECK_INTERVAL = 0
+
+# Production JSON renderer/parser plus the browsable API
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "api.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "api.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
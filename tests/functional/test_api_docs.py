@@ -89,6 +89,19 @@ class APIDocumentationTest(TestCase):
             publish_path = schema["paths"]["/api/v1/posts/{id}/publish/"]
             self.assertIn("post", publish_path)
 
+    def test_api_schema_debug_endpoints(self):
+        """Test that the debug endpoints are documented"""
+        response = self.client.get("/api/schema/?format=json")
+        self.assertEqual(response.status_code, 200)
+
+        paths = response.json()["paths"]
+        slow_queries = paths["/api/v1/debug/slow-queries/"]["get"]
+        self.assertIn("application/json", slow_queries["responses"]["200"]["content"])
+        profile = paths["/api/v1/debug/profile/"]["get"]
+        self.assertIn("text/plain", profile["responses"]["200"]["content"])
+        parameters = {parameter["name"] for parameter in profile["parameters"]}
+        self.assertLessEqual({"seconds", "interval", "route", "every"}, parameters)
+
 
 class APIRootUpdatedTest(TestCase):
     def setUp(self):
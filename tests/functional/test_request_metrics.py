@@ -0,0 +1,64 @@
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase
+from prometheus_client import REGISTRY
+
+from api.middleware import RequestMetricsMiddleware
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    def test_requests_are_labelled_by_route_name(self):
+        labels = {"method": "GET", "endpoint": "post-list"}
+        count = sample("http_requests_total", status="200", **labels)
+        observed = sample("http_request_duration_seconds_count", **labels)
+        sizes = sample("http_response_size_bytes_sum", **labels)
+
+        response = self.client.get("/api/v1/posts/")
+
+        self.assertEqual(
+            sample("http_requests_total", status="200", **labels), count + 1
+        )
+        self.assertEqual(
+            sample("http_request_duration_seconds_count", **labels), observed + 1
+        )
+        self.assertEqual(
+            sample("http_response_size_bytes_sum", **labels),
+            sizes + len(response.content),
+        )
+
+    def test_detail_routes_share_one_label(self):
+        labels = {"method": "GET", "endpoint": "user-detail", "status": "404"}
+        before = sample("http_requests_total", **labels)
+        self.client.get("/api/v1/users/12345/")
+        self.client.get("/api/v1/users/67890/")
+        self.assertEqual(sample("http_requests_total", **labels), before + 2)
+
+    def test_unresolved_paths_are_grouped(self):
+        labels = {"method": "GET", "endpoint": "unmatched", "status": "404"}
+        before = sample("http_requests_total", **labels)
+        self.client.get("/no/such/page/")
+        self.assertEqual(sample("http_requests_total", **labels), before + 1)
+
+    def test_in_flight_requests_are_tracked(self):
+        seen = []
+
+        def get_response(request):
+            seen.append(sample("active_connections"))
+            return HttpResponse("ok")
+
+        before = sample("active_connections")
+        request = RequestFactory().get("/demo-lb/")
+        request.resolver_match = None
+        RequestMetricsMiddleware(get_response)(request)
+        self.assertEqual(seen, [before + 1])
+        self.assertEqual(sample("active_connections"), before)
+
+    async def test_async_requests_are_recorded(self):
+        labels = {"method": "GET", "endpoint": "health-check", "status": "200"}
+        before = sample("http_requests_total", **labels)
+        response = await AsyncClient().get("/health/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sample("http_requests_total", **labels), before + 1)
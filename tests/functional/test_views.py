@@ -1,9 +1,14 @@
 import json
+import os
+import tempfile
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
 from django.test import Client, TestCase
 from django.urls import reverse
+from prometheus_client import Counter, Gauge
+from prometheus_client.multiprocess import mark_process_dead
+from prometheus_client.values import MultiProcessValue
 
 
 class HealthCheckViewTest(TestCase):
@@ -164,6 +169,36 @@ class PrometheusMetricsViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class PrometheusMultiprocessTest(TestCase):
+    """/prometheus/ merges the metric files of all workers"""
+
+    def write_worker_metrics(self, pid, connections):
+        value_class = MultiProcessValue(process_identifier=lambda: pid)
+        with patch("prometheus_client.values.ValueClass", value_class):
+            Counter("mp_test_requests", "Requests", registry=None).inc(2)
+            Gauge(
+                "mp_test_connections",
+                "Connections",
+                registry=None,
+                multiprocess_mode="livesum",
+            ).set(connections)
+
+    def test_metrics_are_aggregated_across_workers(self):
+        with tempfile.TemporaryDirectory() as path, patch.dict(
+            os.environ, {"PROMETHEUS_MULTIPROC_DIR": path}
+        ):
+            self.write_worker_metrics(101, connections=3)
+            self.write_worker_metrics(102, connections=4)
+            # Worker 102 exited: its requests still count, its connections don't
+            mark_process_dead(102, path)
+
+            response = self.client.get(reverse("prometheus-metrics"))
+
+        content = response.content.decode("utf-8")
+        self.assertIn("mp_test_requests_total 4.0", content)
+        self.assertIn("mp_test_connections 3.0", content)
+
+
 class APIRootViewTest(TestCase):
     def setUp(self):
         self.client = Client()
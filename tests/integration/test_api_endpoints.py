@@ -1,10 +1,16 @@
 import json
+from unittest.mock import patch
 
+import msgpack
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from api.models import Comment, Post
+from api.models import Comment, Post, TableVersion
+from api.views import PostViewSet
 
 
 class PostAPITest(APITestCase):
@@ -200,3 +206,295 @@ class UserAPITest(APITestCase):
     def test_user_delete_not_allowed(self):
         response = self.client.delete(f"/api/v1/users/{self.user.id}/")
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class APIQueryCountTest(APITestCase):
+    """List and detail endpoints must not issue per-row queries"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create(username=f"author{i}", email=f"author{i}@example.com")
+            for i in range(5)
+        ]
+        self.post = None
+        for i in range(15):
+            post = Post.objects.create(
+                title=f"Post {i}",
+                content="Content",
+                author=self.users[i % 5],
+                published=True,
+            )
+            for j in range(3):
+                Comment.objects.create(
+                    content=f"Comment {j}", post=post, author=self.users[j]
+                )
+            self.post = post
+
+    def test_posts_list_query_count(self):
+        # Table versions for the ETag, one COUNT for pagination, one SELECT
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/posts/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["comments_count"], 3)
+
+    def test_post_detail_query_count(self):
+        # Table versions, one SELECT for the post, one for its prefetched comments
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/v1/posts/{self.post.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["comments"]), 3)
+        self.assertEqual(response.data["comments_count"], 3)
+
+    def test_comments_list_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/comments/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_users_list_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/users/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(POST_DETAIL_COMMENTS_LIMIT=3)
+class PostCommentsActionTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="commenter")
+        self.post = Post.objects.create(
+            title="Popular Post", content="Content", author=self.user, published=True
+        )
+        self.comments = [
+            Comment.objects.create(
+                content=f"Comment {i}", post=self.post, author=self.user
+            )
+            for i in range(8)
+        ]
+
+    def test_post_detail_embeds_only_newest_comments(self):
+        response = self.client.get(f"/api/v1/posts/{self.post.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [comment["content"] for comment in response.data["comments"]],
+            ["Comment 7", "Comment 6", "Comment 5"],
+        )
+        self.assertEqual(response.data["comments_count"], 8)
+        self.assertTrue(
+            response.data["comments_url"].endswith(
+                f"/api/v1/posts/{self.post.id}/comments/"
+            )
+        )
+
+    def test_post_comments_action_is_cursor_paginated(self):
+        url = f"/api/v1/posts/{self.post.id}/comments/?page_size=5"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", first.data)
+        self.assertEqual(len(first.data["results"]), 5)
+
+        second = self.client.get(first.data["next"])
+        self.assertEqual(len(second.data["results"]), 3)
+        self.assertIsNone(second.data["next"])
+        contents = [
+            c["content"] for c in first.data["results"] + second.data["results"]
+        ]
+        self.assertEqual(contents, [f"Comment {i}" for i in reversed(range(8))])
+
+    def test_post_comments_action_query_count(self):
+        # One query for the post, one for the page of comments and authors
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/v1/posts/{self.post.id}/comments/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_post_comments_action_missing_post(self):
+        response = self.client.get("/api/v1/posts/999999/comments/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MessagePackNegotiationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="packer")
+        self.post = Post.objects.create(
+            title="Packed Post", content="Content", author=self.user, published=True
+        )
+
+    def test_accept_header_selects_msgpack(self):
+        response = self.client.get("/api/v1/posts/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data["results"][0]["title"], "Packed Post")
+
+    def test_format_query_parameter_and_suffix_select_msgpack(self):
+        for url in (
+            f"/api/v1/posts/{self.post.id}/?format=msgpack",
+            f"/api/v1/posts/{self.post.id}.msgpack",
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(msgpack.unpackb(response.content)["id"], self.post.id)
+
+    def test_json_remains_the_default(self):
+        response = self.client.get("/api/v1/posts/")
+        self.assertEqual(response["Content-Type"], "application/json")
+
+    def test_create_comment_from_msgpack_body(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/v1/comments/",
+            msgpack.packb({"content": "Packed comment", "post": self.post.id}),
+            content_type="application/msgpack",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["content"], "Packed comment")
+
+
+class StaleCommentsCountTest(APITestCase):
+    """Post writes must not undo comment counts committed after the post was read"""
+
+    def setUp(self):
+        self.user = User.objects.create(username="writer")
+        self.post = Post.objects.create(
+            title="Counted", content="Content", author=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+        get_object = PostViewSet.get_object
+
+        def get_object_then_comment(view):
+            post = get_object(view)
+            # A comment saved by another request once the post was loaded
+            Comment.objects.create(content="Meanwhile", post=post, author=self.user)
+            return post
+
+        patcher = patch.object(PostViewSet, "get_object", get_object_then_comment)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertCounted(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_publish(self):
+        self.assertCounted(self.client.post(f"/api/v1/posts/{self.post.id}/publish/"))
+        self.assertTrue(self.post.published)
+
+    def test_unpublish(self):
+        response = self.client.post(f"/api/v1/posts/{self.post.id}/unpublish/")
+        self.assertCounted(response)
+
+    def test_update(self):
+        response = self.client.patch(
+            f"/api/v1/posts/{self.post.id}/", {"title": "Renamed"}, format="json"
+        )
+        self.assertCounted(response)
+        self.assertEqual(self.post.title, "Renamed")
+
+
+class BulkCreateTest(APITestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(username="importer")
+            self.post = Post.objects.create(
+                title="Target", content="Content", author=self.user, published=True
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def post_comments(self, count):
+        items = [
+            {"content": f"Comment {i}", "post": self.post.id} for i in range(count)
+        ]
+        return self.client.post("/api/v1/comments/bulk/", items, format="json")
+
+    def test_list_payload_creates_posts(self):
+        items = [{"title": f"Imported {i}", "content": "Body"} for i in range(3)]
+        version = TableVersion.get_versions(Post)["api.post"][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/posts/", items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 3)
+        results = response.data["results"]
+        self.assertEqual(
+            [result["data"]["title"] for result in results],
+            ["Imported 0", "Imported 1", "Imported 2"],
+        )
+        self.assertEqual(results[0]["data"]["author"]["username"], "importer")
+        self.assertEqual(Post.objects.filter(title__startswith="Imported").count(), 3)
+        self.assertEqual(TableVersion.get_versions(Post)["api.post"][0], version + 1)
+
+    def test_invalid_items_are_reported_and_valid_ones_created(self):
+        items = [
+            {"content": "Valid", "post": self.post.id},
+            {"post": self.post.id},
+            {"content": "Missing post", "post": self.post.id + 100},
+            {"content": "Bad key", "post": "x"},
+            "not an object",
+        ]
+        before = TableVersion.get_versions(Comment, Post)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/comments/", items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 4))
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [201, 400, 400, 400, 400]
+        )
+        self.assertIn("content", results[1]["errors"])
+        self.assertIn("post", results[2]["errors"])
+        self.assertIn("post", results[3]["errors"])
+        self.assertIn("non_field_errors", results[4]["errors"])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        after = TableVersion.get_versions(Comment, Post)
+        self.assertTrue(all(after[label][0] > before[label][0] for label in after))
+
+    def test_comments_count_adds_to_the_current_value(self):
+        other = Post.objects.create(title="Other", content="C", author=self.user)
+        # Stands in for a comment another transaction counted but a recount
+        # in this one would not see yet
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        items = [{"content": "C", "post": self.post.id}] * 2 + [
+            {"content": "C", "post": other.id}
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/v1/comments/bulk/", items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        updates = [
+            q["sql"] for q in queries if q["sql"].startswith('UPDATE "api_post"')
+        ]
+        self.assertEqual(len(updates), 2)
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.post.comments_count, other.comments_count), (7, 1))
+
+    def test_nothing_valid_is_a_bad_request(self):
+        response = self.client.post("/api/v1/comments/bulk/", [{}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], 0)
+        self.assertFalse(Comment.objects.exists())
+
+    @override_settings(BULK_CREATE_MAX_ITEMS=2)
+    def test_rejects_empty_oversized_and_non_list_payloads(self):
+        for payload in ([], [{"title": "T", "content": "C"}] * 3, {"title": "T"}):
+            response = self.client.post("/api/v1/posts/bulk/", payload, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.post_comments(2)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_query_count_does_not_grow_with_items(self):
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.post_comments(2).status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(
+                self.post_comments(50).status_code, status.HTTP_201_CREATED
+            )
+        self.assertEqual(len(many), len(few))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 52)
@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Comment, Post, TableVersion
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(username="etag", email="e@example.com")
+            self.post = Post.objects.create(
+                title="Cached", content="Body", author=self.user, published=True
+            )
+            Comment.objects.create(content="First", post=self.post, author=self.user)
+
+    def test_responses_carry_validators(self):
+        for url in (
+            "/api/v1/posts/",
+            f"/api/v1/posts/{self.post.id}/",
+            "/api/v1/comments/",
+            "/api/v1/users/",
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertTrue(response["ETag"].startswith('"'), url)
+            self.assertIn("Last-Modified", response, url)
+            self.assertIn("Accept", response["Vary"], url)
+
+    def test_matching_etag_returns_304_without_querying_the_resource(self):
+        etag = self.client.get("/api/v1/posts/")["ETag"]
+        # Only the table versions are read
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/posts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_depends_on_query_and_media_type(self):
+        etag = self.client.get("/api/v1/posts/")["ETag"]
+        self.assertNotEqual(etag, self.client.get("/api/v1/posts/?page=1")["ETag"])
+        self.assertNotEqual(
+            etag,
+            self.client.get("/api/v1/posts/", HTTP_ACCEPT="application/msgpack")[
+                "ETag"
+            ],
+        )
+        self.assertEqual(
+            self.client.get("/api/v1/posts/?page_size=5&page=1")["ETag"],
+            self.client.get("/api/v1/posts/?page=1&page_size=5")["ETag"],
+        )
+
+    @override_settings(ALLOWED_HOSTS=["internal-svc", "api.example.com"])
+    def test_etag_depends_on_host_and_scheme(self):
+        etags = {
+            self.client.get("/api/v1/posts/", HTTP_HOST=host, secure=secure)["ETag"]
+            for host in ("internal-svc", "api.example.com")
+            for secure in (False, True)
+        }
+        self.assertEqual(len(etags), 4)
+
+    def test_writes_to_rendered_tables_change_the_etag(self):
+        url = f"/api/v1/posts/{self.post.id}/"
+        etag = self.client.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(content="Second", post=self.post, author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["comments"]), 2)
+
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Renamed"
+            self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["author"]["first_name"], "Renamed")
+
+    def test_unrelated_tables_keep_the_etag(self):
+        etag = self.client.get("/api/v1/users/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title="Other", content="Body", author=self.user)
+        response = self.client.get("/api/v1/users/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since(self):
+        response = self.client.get("/api/v1/comments/")
+        last_modified = response["Last-Modified"]
+        response = self.client.get(
+            "/api/v1/comments/", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(
+            "/api/v1/comments/", HTTP_IF_MODIFIED_SINCE=http_date(0)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_browsable_api_is_not_validated(self):
+        response = self.client.get("/api/v1/posts/", HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+
+    def test_reconcile_command_bumps_post_version(self):
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+        before = TableVersion.get_versions(Post)["api.post"][0]
+        call_command("reconcile_comments_count", stdout=StringIO())
+        self.assertEqual(TableVersion.get_versions(Post)["api.post"][0], before + 1)
@@ -0,0 +1,67 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from api.models import Comment, Post
+
+
+@skipUnless(
+    connection.vendor in ("sqlite", "postgresql"),
+    "EXPLAIN assertions are written for SQLite and PostgreSQL",
+)
+class HotPathIndexTest(TestCase):
+    """The hot list queries must be answered from the composite indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f"indexer{i}") for i in range(3)]
+        for i in range(30):
+            post = Post.objects.create(
+                title=f"Post {i}",
+                content="Content",
+                author=cls.users[i % 3],
+                published=i % 2 == 0,
+            )
+            Comment.objects.create(content="Comment", post=post, author=cls.users[0])
+        cls.post = post
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=f"Unexpected plan:\n{plan}")
+
+    def test_published_posts_use_partial_index(self):
+        self.assertUsesIndex(
+            Post.objects.filter(published=True).order_by("-created_at")[:20],
+            "post_published_created_idx",
+        )
+
+    def test_posts_by_author_use_author_index(self):
+        self.assertUsesIndex(
+            Post.objects.filter(author=self.users[1]).order_by("-created_at")[:20],
+            "post_author_created_idx",
+        )
+
+    def test_comments_by_post_use_post_index(self):
+        self.assertUsesIndex(
+            Comment.objects.filter(post=self.post).order_by("-created_at", "-id")[:20],
+            "comment_post_created_idx",
+        )
+
+    def test_comments_by_author_use_author_index(self):
+        self.assertUsesIndex(
+            Comment.objects.filter(author=self.users[0]).order_by("-created_at")[:20],
+            "comment_author_created_idx",
+        )
+
+    def test_keyset_order_uses_created_id_index(self):
+        self.assertUsesIndex(
+            Post.objects.order_by("-created_at", "-id")[:20], "post_created_id_idx"
+        )
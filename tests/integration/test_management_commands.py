@@ -0,0 +1,223 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from channels.layers import DEFAULT_CHANNEL_LAYER, channel_layers
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count, F
+from django.test import LiveServerTestCase, TestCase, override_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from api.consumers import metrics_broadcaster, status_broadcaster
+from api.management.commands.loadtest import OPERATIONS
+from api.models import Comment, Post, TableVersion
+
+
+class ReconcileCommentsCountCommandTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="reconciler")
+        self.posts = [
+            Post.objects.create(title=f"Post {i}", content="Content", author=self.user)
+            for i in range(5)
+        ]
+        for post in self.posts:
+            Comment.objects.create(content="Comment", post=post, author=self.user)
+
+    def test_reconciles_drifted_posts_in_batches(self):
+        Post.objects.filter(pk__in=[self.posts[0].pk, self.posts[3].pk]).update(
+            comments_count=7
+        )
+        out = StringIO()
+        call_command("reconcile_comments_count", batch_size=2, stdout=out)
+
+        self.assertIn("Reconciled 2 drifted post(s) out of 5 checked", out.getvalue())
+        self.assertEqual(
+            set(Post.objects.values_list("comments_count", flat=True)), {1}
+        )
+
+    def test_dry_run_leaves_counters_untouched(self):
+        Post.objects.filter(pk=self.posts[1].pk).update(comments_count=0)
+        out = StringIO()
+        call_command("reconcile_comments_count", dry_run=True, stdout=out)
+
+        self.assertIn("Found 1 drifted post(s)", out.getvalue())
+        self.posts[1].refresh_from_db()
+        self.assertEqual(self.posts[1].comments_count, 0)
+
+    def test_rejects_invalid_batch_size(self):
+        with self.assertRaises(CommandError):
+            call_command("reconcile_comments_count", batch_size=0)
+
+
+class BenchmarkSerializersCommandTest(TestCase):
+    def test_reports_each_endpoint_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_serializers", rows=10, repeat=1, stdout=out)
+
+        output = out.getvalue()
+        for name in ("posts", "comments", "users"):
+            self.assertIn(name, output)
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+
+class BenchmarkEncodingsCommandTest(TestCase):
+    def test_reports_each_encoding(self):
+        out = StringIO()
+        call_command("benchmark_encodings", page_size=5, iterations=1, stdout=out)
+
+        output = out.getvalue()
+        for encoding in ("json", "msgpack"):
+            self.assertIn(encoding, output)
+        self.assertFalse(Post.objects.exists())
+
+
+class SeedPerfCommandTest(TestCase):
+    options = {"users": 20, "posts": 50, "comments": 400, "batch_size": 7}
+
+    def seed(self, **options):
+        call_command(
+            "seed_perf",
+            **{**self.options, **options},
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+    def snapshot(self):
+        posts = Post.objects.order_by("pk").values_list(
+            "author__username", "title", "created_at", "published", "comments_count"
+        )
+        comments = Comment.objects.order_by("pk").values_list(
+            "post__title", "author__username", "content", "created_at"
+        )
+        return list(posts), list(comments)
+
+    def test_seeds_skewed_rows_with_correct_counters(self):
+        self.seed()
+
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), 400)
+        self.assertFalse(
+            Post.objects.annotate(actual=Count("comments"))
+            .exclude(comments_count=F("actual"))
+            .exists()
+        )
+        self.assertFalse(
+            Comment.objects.filter(created_at__lt=F("post__created_at")).exists()
+        )
+        # Evenly spread, every post would have 8 comments
+        top = Post.objects.order_by("-comments_count").first()
+        self.assertGreater(top.comments_count, 3 * 8)
+        versions = TableVersion.get_versions(User, Post, Comment)
+        self.assertTrue(all(version for version, _ in versions.values()))
+
+    def test_same_seed_gives_same_rows(self):
+        self.seed(seed=7)
+        first = self.snapshot()
+        User.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_batch_size_does_not_change_the_rows(self):
+        self.seed(seed=7)
+        first = self.snapshot()
+        User.objects.all().delete()
+        self.seed(seed=7, batch_size=1000)
+        self.assertEqual(self.snapshot(), first)
+
+    @override_settings(DEBUG=True)
+    def test_debug_query_log_is_cleared_per_batch(self):
+        err = StringIO()
+        call_command("seed_perf", **self.options, stdout=StringIO(), stderr=err)
+        self.assertIn("DEBUG is on", err.getvalue())
+        self.assertLess(len(connection.queries), 10)
+
+    def test_rejects_a_seed_already_in_the_database(self):
+        self.seed(seed=3)
+        with self.assertRaises(CommandError):
+            self.seed(seed=3)
+
+    def test_copy_needs_postgresql(self):
+        with self.assertRaises(CommandError):
+            self.seed(method="copy")
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    def setUp(self):
+        # Throttle rates are read when DRF is imported
+        rates = {"anon": "100000/s", "user": "100000/s"}
+        patcher = patch.dict(SimpleRateThrottle.THROTTLE_RATES, rates)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_loadtest(self, **options):
+        out = StringIO()
+        call_command(
+            "loadtest",
+            url=self.live_server_url,
+            duration=0.5,
+            warmup=0,
+            concurrency=2,
+            report="-",
+            stdout=out,
+            stderr=StringIO(),
+            **options,
+        )
+        return json.loads(out.getvalue())
+
+    def test_closed_loop_report(self):
+        report = self.run_loadtest()
+
+        self.assertGreater(report["requests"], 0)
+        self.assertEqual(report["errors"], 0)
+        self.assertEqual(set(report["operations"]), set(OPERATIONS))
+        self.assertIn("p99", report["latency_ms"])
+        self.assertIn("post-list", report["queries_per_request"])
+        # Created posts and comments went through the API as the loadtest user
+        self.assertTrue(Post.objects.filter(author__username="loadtest").exists())
+
+    def test_open_loop_report(self):
+        report = self.run_loadtest(mode="open", rate=40, mix="health=1,list=1")
+
+        self.assertEqual(report["mode"], "open")
+        self.assertEqual(set(report["operations"]), {"health", "list"})
+        self.assertGreater(report["requests"], 0)
+
+    def test_rejects_unknown_operations(self):
+        with self.assertRaises(CommandError):
+            call_command("loadtest", url=self.live_server_url, mix="search=1")
+
+
+class BenchmarkWebsocketsCommandTest(TestCase):
+    def test_every_socket_receives_every_round(self):
+        layer = channel_layers.backends.get(DEFAULT_CHANNEL_LAYER)
+        out = StringIO()
+        call_command(
+            "benchmark_websockets",
+            clients=5,
+            rounds=2,
+            interval=0,
+            report="-",
+            stdout=out,
+            stderr=StringIO(),
+        )
+
+        report = json.loads(out.getvalue())
+        # The command's layer and paused producers do not outlive it
+        self.assertIs(channel_layers.backends.get(DEFAULT_CHANNEL_LAYER), layer)
+        self.assertFalse(metrics_broadcaster.paused or status_broadcaster.paused)
+        self.assertEqual(report["connections"], 10)
+        self.assertEqual(report["timeouts"], 0)
+        for group in ("metrics", "status"):
+            stats = report["groups"][group]
+            self.assertEqual(stats["frames"], stats["expected_frames"])
+            self.assertEqual(stats["expected_frames"], 10)
+            self.assertIsNotNone(stats["latency_ms"]["p99"])
+
+    def test_rejects_unknown_groups(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark_websockets", groups="chat")
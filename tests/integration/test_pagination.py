@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Comment, Post
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="pager")
+        self.posts = [
+            Post.objects.create(title=f"Post {i}", content="Content", author=self.user)
+            for i in range(25)
+        ]
+        # Several posts share a timestamp so the id tie-breaker is exercised
+        now = timezone.now()
+        for i, post in enumerate(self.posts):
+            Post.objects.filter(pk=post.pk).update(
+                created_at=now - timedelta(minutes=i // 4)
+            )
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get("/api/v1/posts/")
+        self.assertEqual(response.data["count"], 25)
+        self.assertIn("?page=2", response.data["next"])
+
+    def test_cursor_mode_omits_count(self):
+        response = self.client.get("/api/v1/posts/?pagination=cursor&page_size=10")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertIn("cursor=", response.data["next"])
+        self.assertIsNone(response.data["previous"])
+
+    def test_cursor_walk_visits_every_post_once_in_order(self):
+        ids = self.walk("/api/v1/posts/?pagination=cursor&page_size=7")
+        expected = list(
+            Post.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get("/api/v1/posts/?pagination=cursor&page_size=5")
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(
+            [item["id"] for item in back.data["results"]],
+            [item["id"] for item in first.data["results"]],
+        )
+
+    def test_deep_cursor_page_runs_single_query(self):
+        url = "/api/v1/posts/?pagination=cursor&page_size=5"
+        for _ in range(3):
+            url = self.client.get(url).data["next"]
+        # The page itself plus the table versions lookup for the ETag
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_invalid_cursor_returns_not_found(self):
+        response = self.client.get("/api/v1/posts/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_comments_support_cursor_mode(self):
+        for i in range(3):
+            Comment.objects.create(
+                content=f"Comment {i}", post=self.posts[0], author=self.user
+            )
+        ids = self.walk("/api/v1/comments/?pagination=cursor&page_size=2")
+        self.assertEqual(len(ids), 3)
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import profiling
+from api.middleware import ProfilingMiddleware
+from api.profiling import ProfilerBusy, SamplingProfiler, collapsed, profile
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class SamplingProfilerTest(SimpleTestCase):
+    def test_samples_running_threads(self):
+        profiler = SamplingProfiler(0.001)
+        profiler.start()
+        worker = threading.Thread(target=busy_wait, args=(0.1,), name="busy")
+        worker.start()
+        worker.join()
+        stacks = profiler.stop()
+
+        busy = [stack for stack in stacks if stack.startswith("busy;")]
+        self.assertTrue(busy)
+        self.assertTrue(all(stack.endswith(f"{__name__}:busy_wait") for stack in busy))
+        self.assertFalse(any("sampling-profiler" in stack for stack in stacks))
+
+    def test_collapsed_output(self):
+        profiler = SamplingProfiler(0.001)
+        profiler.stacks.update({"main;a:f": 3, "main;a:f;a:g": 5})
+        self.assertEqual(collapsed(profiler.stacks), "main;a:f;a:g 5\nmain;a:f 3\n")
+
+    def test_one_profile_at_a_time(self):
+        started = threading.Event()
+
+        def run():
+            started.set()
+            profile(0.2, 0.01)
+
+        first = threading.Thread(target=run)
+        first.start()
+        started.wait()
+        time.sleep(0.05)
+        with self.assertRaises(ProfilerBusy):
+            profile(0.01, 0.01)
+        first.join()
+
+
+class RouteProfilingTest(SimpleTestCase):
+    def handle(self, path):
+        def get_response(request):
+            busy_wait(0.05)
+            return HttpResponse()
+
+        ProfilingMiddleware(get_response)(RequestFactory().get(path))
+
+    def test_samples_only_one_in_every_matching_request(self):
+        results = []
+        profiler_thread = threading.Thread(
+            target=lambda: results.append(
+                profile(0.5, 0.002, route="post-list", every=2)
+            )
+        )
+        profiler_thread.start()
+        while profiling.active_sampling is None:
+            time.sleep(0.001)
+        self.handle("/api/v1/users/")
+        for _ in range(3):
+            self.handle("/api/v1/posts/")
+        profiler_thread.join()
+
+        profiler, sampling = results[0]
+        self.assertEqual(sampling.requests, 2)
+        self.assertTrue(profiler.stacks)
+        self.assertTrue(
+            all(stack.endswith(f"{__name__}:busy_wait") for stack in profiler.stacks)
+        )
+        self.assertIsNone(profiling.active_sampling)
+
+    async def test_async_requests_are_sampled_on_their_view_thread(self):
+        results = []
+        profiler_thread = threading.Thread(
+            target=lambda: results.append(profile(0.2, 0.002, route="health-check"))
+        )
+        profiler_thread.start()
+        while profiling.active_sampling is None:
+            await asyncio.sleep(0.001)
+        response = await AsyncClient().get("/health/")
+        await asyncio.to_thread(profiler_thread.join)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(results[0][1].requests, 1)
+
+
+class ProfileEndpointTest(APITestCase):
+    url = "/api/v1/debug/profile/"
+
+    def test_admin_only(self):
+        user = User.objects.create(username="user")
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url, {"seconds": 0.01})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_returns_collapsed_stacks(self):
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        worker = threading.Thread(target=busy_wait, args=(0.2,), name="busy")
+        worker.start()
+        response = self.client.get(self.url, {"seconds": 0.1, "interval": 0.005})
+        worker.join()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertGreater(int(response["X-Profile-Samples"]), 0)
+        lines = response.content.decode().splitlines()
+        self.assertTrue(any(line.startswith("busy;") for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+    def test_rejects_long_runs(self):
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get(self.url, {"seconds": 3600})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_runs_end_before_the_worker_timeout(self):
+        self.assertLess(settings.PROFILER_MAX_SECONDS, settings.WORKER_TIMEOUT)
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get(self.url, {"seconds": settings.WORKER_TIMEOUT})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
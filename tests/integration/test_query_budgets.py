@@ -0,0 +1,205 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework.throttling import SimpleRateThrottle
+
+from api.models import Comment, Post, TableVersion
+
+# Rows of each kind seeded before every measurement. A budget holds only if
+# the query count is the same at every size.
+DATASET_SIZES = (5, 25, 100)
+
+# Comments per post in the seeded data
+COMMENTS_PER_POST = 3
+
+# Items per bulk request
+BULK_ITEMS = 10
+
+# endpoint: (method, path, signed in, query budget, where the queries go)
+QUERY_BUDGETS = {
+    "posts list": ("get", "/api/v1/posts/", False, 3, "versions, COUNT, page"),
+    "post detail": (
+        "get",
+        "/api/v1/posts/{post}/",
+        False,
+        3,
+        "versions, post, newest comments",
+    ),
+    "post comments": ("get", "/api/v1/posts/{post}/comments/", False, 2, "post, page"),
+    "comments list": ("get", "/api/v1/comments/", False, 3, "versions, COUNT, page"),
+    "users list": ("get", "/api/v1/users/", False, 3, "versions, COUNT, page"),
+    "post create": (
+        "post",
+        "/api/v1/posts/",
+        True,
+        2,
+        "INSERT, version bump",
+    ),
+    "comment create": (
+        "post",
+        "/api/v1/comments/",
+        True,
+        7,
+        "post, savepoint, INSERT, comments_count, release, two version bumps",
+    ),
+    "posts bulk": (
+        "post",
+        "/api/v1/posts/bulk/",
+        True,
+        4,
+        "savepoint, INSERT, release, version bump",
+    ),
+    "comments bulk": (
+        "post",
+        "/api/v1/comments/bulk/",
+        True,
+        7,
+        "posts, savepoint, INSERT, comments_count, release, two version bumps",
+    ),
+    "post publish": (
+        "post",
+        "/api/v1/posts/{post}/publish/",
+        True,
+        3,
+        "post, UPDATE, version bump",
+    ),
+    "post unpublish": (
+        "post",
+        "/api/v1/posts/{post}/unpublish/",
+        True,
+        3,
+        "post, UPDATE, version bump",
+    ),
+}
+
+PAYLOADS = {
+    "post create": lambda post: {"title": "New", "content": "Body", "published": True},
+    "comment create": lambda post: {"post": post.id, "content": "New comment"},
+    "posts bulk": lambda post: [
+        {"title": f"New {i}", "content": "Body"} for i in range(BULK_ITEMS)
+    ],
+    "comments bulk": lambda post: [
+        {"post": post.id, "content": f"New comment {i}"} for i in range(BULK_ITEMS)
+    ],
+}
+
+
+class QueryBudgetTest(APITestCase):
+    """
+    Every endpoint in `QUERY_BUDGETS` runs a fixed number of queries however
+    many posts, comments and users exist. Failures print the counts at each
+    dataset size and the SQL of the largest run.
+    """
+
+    def setUp(self):
+        # Without rates nothing is throttled or counted toward later tests
+        rates = {"anon": None, "user": None}
+        patcher = patch.dict(SimpleRateThrottle.THROTTLE_RATES, rates)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = User.objects.create(username="owner")
+        self.post = Post.objects.create(
+            title="Owned", content="Body", author=self.owner, published=True
+        )
+        self.seeded = 0
+
+    def grow_to(self, size):
+        """Add users, published posts and their comments up to `size` of each"""
+        new = range(self.seeded, size)
+        users = User.objects.bulk_create(User(username=f"budget-{i}") for i in new)
+        posts = Post.objects.bulk_create(
+            Post(
+                title=f"Post {i}",
+                content="Body",
+                author=user,
+                published=True,
+                comments_count=COMMENTS_PER_POST,
+            )
+            for i, user in zip(new, users)
+        )
+        Comment.objects.bulk_create(
+            Comment(content="Comment", post=post, author=users[j % len(users)])
+            for post in posts
+            for j in range(COMMENTS_PER_POST)
+        )
+        # bulk_create skips the signals that bump table versions
+        TableVersion.bump(User, Post, Comment)
+        self.seeded = size
+
+    def measure(self, endpoint):
+        method, path, signed_in, _, _ = QUERY_BUDGETS[endpoint]
+        if signed_in:
+            self.client.force_authenticate(self.owner)
+        payload = PAYLOADS.get(endpoint, lambda post: None)(self.post)
+        with CaptureQueriesContext(connection) as queries:
+            # Version bumps run on commit and belong to the request
+            with self.captureOnCommitCallbacks(execute=True):
+                response = getattr(self.client, method)(
+                    path.format(post=self.post.id), payload, format="json"
+                )
+        self.client.force_authenticate(None)
+        self.assertLess(response.status_code, 300, f"{endpoint}: {response.data}")
+        return queries
+
+    def assertWithinBudget(self, endpoint):
+        budget, note = QUERY_BUDGETS[endpoint][3:]
+        counts = {}
+        for size in DATASET_SIZES:
+            self.grow_to(size)
+            queries = self.measure(endpoint)
+            counts[size] = len(queries)
+        if all(count <= budget for count in counts.values()):
+            return
+        sql = "\n".join(
+            f"  {i}. {query['sql']}" for i, query in enumerate(queries, start=1)
+        )
+        self.fail(
+            f"{endpoint} exceeds its budget of {budget} queries ({note}).\n"
+            + "".join(f"  {size:>4} rows: {counts[size]} queries\n" for size in counts)
+            + f"Queries at {size} rows:\n{sql}"
+        )
+
+    def test_posts_list(self):
+        self.assertWithinBudget("posts list")
+
+    def test_post_detail(self):
+        self.assertWithinBudget("post detail")
+
+    def test_post_comments(self):
+        self.assertWithinBudget("post comments")
+
+    def test_comments_list(self):
+        self.assertWithinBudget("comments list")
+
+    def test_users_list(self):
+        self.assertWithinBudget("users list")
+
+    def test_post_create(self):
+        self.assertWithinBudget("post create")
+
+    def test_comment_create(self):
+        self.assertWithinBudget("comment create")
+
+    def test_posts_bulk(self):
+        self.assertWithinBudget("posts bulk")
+
+    def test_comments_bulk(self):
+        self.assertWithinBudget("comments bulk")
+
+    def test_post_publish(self):
+        self.assertWithinBudget("post publish")
+
+    def test_post_unpublish(self):
+        self.assertWithinBudget("post unpublish")
+
+    def test_every_budgeted_endpoint_is_tested(self):
+        tested = {
+            name[len("test_") :].replace("_", " ")
+            for name in dir(self)
+            if name.startswith("test_")
+            and name != "test_every_budgeted_endpoint_is_tested"
+        }
+        self.assertEqual(set(QUERY_BUDGETS), tested)
@@ -0,0 +1,114 @@
+from django.contrib.auth.models import User
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Post
+from api.queries import SlowQueryLog, normalize_sql, slow_queries
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class NormalizeSqlTest(SimpleTestCase):
+    def test_literals_and_parameters_are_replaced(self):
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM t\nWHERE a = 'x' AND b = %s LIMIT 21"),
+            "SELECT * FROM t WHERE a = ? AND b = ? LIMIT ?",
+        )
+
+    def test_lists_collapse(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s)"),
+            "SELECT * FROM t WHERE id IN (...)",
+        )
+        self.assertEqual(
+            normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"),
+            "INSERT INTO t (a, b) VALUES (...)",
+        )
+
+
+@override_settings(SLOW_QUERY_EXPLAIN_SIZE=2)
+class SlowQueryLogTest(SimpleTestCase):
+    def entry(self, statement, duration_ms):
+        return {"statement": statement, "duration_ms": duration_ms}
+
+    def test_keeps_slowest_distinct_statements(self):
+        log = SlowQueryLog()
+        for statement, duration_ms in (("a", 10), ("b", 30), ("c", 20)):
+            if log.wants(statement, duration_ms / 1000):
+                log.add(self.entry(statement, duration_ms))
+        self.assertEqual([e["statement"] for e in log.entries()], ["b", "c"])
+        self.assertFalse(log.wants("d", 0.005))
+
+    def test_statement_is_replaced_only_by_a_slower_run(self):
+        log = SlowQueryLog()
+        log.add(self.entry("a", 10))
+        self.assertFalse(log.wants("a", 0.005))
+        self.assertTrue(log.wants("a", 0.050))
+
+
+class QueryInstrumentationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="queries")
+        Post.objects.create(title="Q", content="Body", author=self.user, published=True)
+        slow_queries.clear()
+
+    def test_queries_are_counted_per_route(self):
+        labels = {"endpoint": "post-list"}
+        requests = sample("db_queries_per_request_count", **labels)
+        queries = sample("db_queries_per_request_sum", **labels)
+        timed = sample("db_query_duration_seconds_count", **labels)
+        with self.assertNumQueries(3):
+            self.client.get("/api/v1/posts/")
+        self.assertEqual(sample("db_queries_per_request_count", **labels), requests + 1)
+        self.assertEqual(sample("db_queries_per_request_sum", **labels), queries + 3)
+        self.assertEqual(sample("db_query_duration_seconds_count", **labels), timed + 3)
+
+    async def test_queries_of_async_requests_are_counted(self):
+        labels = {"endpoint": "post-list"}
+        queries = sample("db_queries_per_request_sum", **labels)
+        await AsyncClient().get("/api/v1/posts/")
+        self.assertEqual(sample("db_queries_per_request_sum", **labels), queries + 3)
+
+    def test_queries_outside_requests_are_ignored(self):
+        timed = sample("db_query_duration_seconds_count", endpoint="unmatched")
+        Post.objects.count()
+        self.assertEqual(
+            sample("db_query_duration_seconds_count", endpoint="unmatched"), timed
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD=1e-9, SLOW_QUERY_EXPLAIN_SIZE=10)
+    def test_slow_queries_are_logged_and_explained(self):
+        with self.assertLogs("api.queries", "WARNING") as logs:
+            self.client.get("/api/v1/posts/")
+        self.assertIn("in post-list: SELECT", logs.output[0])
+
+        entries = slow_queries.entries()
+        self.assertTrue(entries)
+        self.assertTrue(all(e["endpoint"] == "post-list" for e in entries))
+        self.assertTrue(all(e["plan"] for e in entries))
+        self.assertFalse(any(e["plan"].startswith("Error") for e in entries))
+
+    @override_settings(SLOW_QUERY_THRESHOLD=1e-9)
+    def test_explain_is_off_by_default(self):
+        with self.assertLogs("api.queries", "WARNING"):
+            self.client.get("/api/v1/posts/")
+        self.assertEqual(slow_queries.entries(), [])
+
+    def test_slow_query_log_is_admin_only(self):
+        url = "/api/v1/debug/slow-queries/"
+        self.assertIn(
+            self.client.get(url).status_code,
+            (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN),
+        )
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["queries"], [])
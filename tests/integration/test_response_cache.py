@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Comment, Post
+
+
+@override_settings(API_CACHE_TIMEOUT=60)
+class ResponseCacheTest(APITestCase):
+    def setUp(self):
+        caches["api"].clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(username="cached", email="c@example.com")
+            self.post = Post.objects.create(
+                title="Cached", content="Body", author=self.user, published=True
+            )
+
+    def test_repeated_read_is_served_from_cache(self):
+        first = self.client.get("/api/v1/posts/")
+        # Only the table versions that name the cache entry are read
+        with self.assertNumQueries(1):
+            second = self.client.get("/api/v1/posts/")
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_media_types_are_cached_separately(self):
+        self.client.get("/api/v1/posts/")
+        response = self.client.get("/api/v1/posts/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+
+    @override_settings(ALLOWED_HOSTS=["internal-svc", "api.example.com"])
+    def test_hosts_are_cached_separately(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title="Second", content="Body", author=self.user, published=True
+            )
+        url = "/api/v1/posts/?pagination=cursor&page_size=1"
+        cache = caches["api"]
+        with mock.patch.object(cache, "fetch", wraps=cache.fetch) as fetch:
+            internal = self.client.get(url, HTTP_HOST="internal-svc:8000")
+            public = self.client.get(url, HTTP_HOST="api.example.com")
+
+        self.assertTrue(internal.json()["next"].startswith("http://internal-svc:8000/"))
+        self.assertTrue(public.json()["next"].startswith("http://api.example.com/"))
+        self.assertNotEqual(internal["ETag"], public["ETag"])
+        keys = [call.args[0] for call in fetch.call_args_list]
+        self.assertEqual(len(set(keys)), 2)
+
+    def test_comment_write_invalidates_post_detail(self):
+        url = f"/api/v1/posts/{self.post.id}/"
+        self.assertEqual(self.client.get(url).data["comments_count"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(content="New", post=self.post, author=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.data["comments_count"], 1)
+
+    def test_unpublish_invalidates_list(self):
+        self.assertTrue(
+            self.client.get("/api/v1/posts/").data["results"][0]["published"]
+        )
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/v1/posts/{self.post.id}/unpublish/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(None)
+        results = self.client.get("/api/v1/posts/").json()["results"]
+        self.assertFalse(results[0]["published"])
+
+    def test_entries_are_scoped_by_user(self):
+        self.client.get("/api/v1/users/")
+        self.client.force_authenticate(self.user)
+        # An authenticated user does not reuse the anonymous entry
+        with self.assertNumQueries(3):
+            self.client.get("/api/v1/users/")
+        with self.assertNumQueries(1):
+            self.client.get("/api/v1/users/")
+
+    def test_error_responses_are_not_cached(self):
+        self.client.get("/api/v1/posts/999999/")
+        # Versions plus the object lookup, again
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/posts/999999/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(API_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_cache(self):
+        self.client.get("/api/v1/posts/")
+        with self.assertNumQueries(3):
+            self.client.get("/api/v1/posts/")
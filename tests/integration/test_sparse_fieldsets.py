@@ -0,0 +1,89 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Comment, Post
+
+
+class SparseFieldsetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="sparse", email="s@example.com")
+        self.post = Post.objects.create(
+            title="Sparse Post", content="Long content", author=self.user
+        )
+        self.comment = Comment.objects.create(
+            content="Sparse comment", post=self.post, author=self.user
+        )
+
+    def get_with_sql(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, " ".join(query["sql"] for query in queries.captured_queries)
+
+    def test_posts_list_fields_trim_output_and_skip_author_join(self):
+        response, sql = self.get_with_sql("/api/v1/posts/?fields=id,title")
+        self.assertEqual(
+            response.data["results"], [{"id": self.post.id, "title": "Sparse Post"}]
+        )
+        self.assertNotIn("auth_user", sql)
+        self.assertNotIn('"content"', sql)
+
+    def test_posts_list_exclude_keeps_remaining_fields(self):
+        response = self.client.get("/api/v1/posts/?exclude=author,comments_count")
+        result = response.data["results"][0]
+        self.assertNotIn("author", result)
+        self.assertNotIn("comments_count", result)
+        self.assertEqual(result["title"], "Sparse Post")
+
+    def test_post_detail_defers_unselected_columns_and_relations(self):
+        response, sql = self.get_with_sql(
+            f"/api/v1/posts/{self.post.id}/?fields=id,title,comments_count"
+        )
+        self.assertEqual(
+            response.data,
+            {"id": self.post.id, "title": "Sparse Post", "comments_count": 1},
+        )
+        self.assertNotIn("auth_user", sql)
+        self.assertNotIn("api_comment", sql)
+        self.assertNotIn('"content"', sql)
+
+    def test_comments_list_fields(self):
+        response, sql = self.get_with_sql("/api/v1/comments/?fields=id,content")
+        self.assertEqual(
+            response.data["results"],
+            [{"id": self.comment.id, "content": "Sparse comment"}],
+        )
+        self.assertNotIn("auth_user", sql)
+
+    def test_users_fields(self):
+        response, sql = self.get_with_sql(
+            f"/api/v1/users/{self.user.id}/?fields=username"
+        )
+        self.assertEqual(response.data, {"username": "sparse"})
+        self.assertNotIn('"email"', sql)
+
+    def test_cursor_pagination_with_sparse_fields(self):
+        Post.objects.create(title="Second", content="Content", author=self.user)
+        response = self.client.get(
+            "/api/v1/posts/?pagination=cursor&page_size=1&fields=title"
+        )
+        self.assertEqual(response.data["results"], [{"title": "Second"}])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"], [{"title": "Sparse Post"}])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get("/api/v1/posts/?fields=title,password")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+
+    def test_fields_are_ignored_for_writes(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/v1/comments/?fields=id",
+            {"content": "Written", "post": self.post.id},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("author", response.data)
@@ -1,8 +1,18 @@
 import asyncio
 import json
+import time
 from unittest import TestCase
+from unittest.mock import AsyncMock, patch
 
-from api.consumers import MetricsConsumer, StatusConsumer
+import msgpack
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from prometheus_client import REGISTRY
+
+from api.broadcast import GroupBroadcaster
+from api.consumers import MetricsConsumer, StatusConsumer, metrics_broadcaster
 
 
 class WebSocketConsumerTest(TestCase):
@@ -26,7 +36,7 @@ class WebSocketConsumerTest(TestCase):
         self.assertTrue(hasattr(consumer, "connect"))
         self.assertTrue(hasattr(consumer, "disconnect"))
         self.assertTrue(hasattr(consumer, "get_metrics_data"))
-        self.assertTrue(hasattr(consumer, "send_metrics_updates"))
+        self.assertTrue(hasattr(consumer, "metrics_update"))
 
     def test_status_consumer_has_required_methods(self):
         """Test that StatusConsumer has all required methods"""
@@ -35,5 +45,199 @@ class WebSocketConsumerTest(TestCase):
         self.assertTrue(hasattr(consumer, "connect"))
         self.assertTrue(hasattr(consumer, "disconnect"))
         self.assertTrue(hasattr(consumer, "get_status_data"))
-        self.assertTrue(hasattr(consumer, "send_status_updates"))
-        self.assertTrue(hasattr(consumer, "test_database_connection"))
+        self.assertTrue(hasattr(consumer, "status_update"))
+
+
+class WebSocketFrameEncodingTest(TestCase):
+    """Consumers send JSON text frames unless the client asks for MessagePack"""
+
+    metrics = {"cpu_percent": 12.5, "memory_percent": 40.0, "disk_percent": 55.0}
+
+    def receive_first_frame(self, path, subprotocols=None):
+        async def run():
+            communicator = WebsocketCommunicator(
+                MetricsConsumer.as_asgi(), path, subprotocols=subprotocols
+            )
+            connected, subprotocol = await communicator.connect()
+            self.assertTrue(connected)
+            frame = await communicator.receive_output(timeout=2)
+            await communicator.disconnect()
+            return subprotocol, frame
+
+        with patch.object(
+            MetricsConsumer, "get_metrics_data", AsyncMock(return_value=self.metrics)
+        ):
+            return asyncio.run(run())
+
+    def test_default_frames_are_json_text(self):
+        subprotocol, frame = self.receive_first_frame("/ws/metrics/")
+        self.assertIsNone(subprotocol)
+        self.assertEqual(json.loads(frame["text"])["data"], self.metrics)
+
+    def test_msgpack_subprotocol_selects_binary_frames(self):
+        subprotocol, frame = self.receive_first_frame(
+            "/ws/metrics/", subprotocols=["msgpack"]
+        )
+        self.assertEqual(subprotocol, "msgpack")
+        payload = msgpack.unpackb(frame["bytes"])
+        self.assertEqual(payload["type"], "metrics_update")
+        self.assertEqual(payload["data"], self.metrics)
+
+    def test_format_query_parameter_selects_binary_frames(self):
+        _, frame = self.receive_first_frame("/ws/metrics/?format=msgpack")
+        self.assertEqual(msgpack.unpackb(frame["bytes"])["data"], self.metrics)
+
+
+@override_settings(METRICS_BROADCAST_INTERVAL=0.05)
+class MetricsBroadcastTest(SimpleTestCase):
+    """All metrics sockets relay one shared broadcast"""
+
+    broadcast = {"cpu_percent": 99.0, "hostname": "leader"}
+
+    def setUp(self):
+        cache.delete(metrics_broadcaster.lease_key)
+
+    def test_connections_share_one_producer(self):
+        produce = AsyncMock(return_value=self.broadcast)
+
+        async def run():
+            communicators = [
+                WebsocketCommunicator(MetricsConsumer.as_asgi(), "/ws/metrics/")
+                for _ in range(3)
+            ]
+            for communicator in communicators:
+                connected, _ = await communicator.connect()
+                self.assertTrue(connected)
+                # Initial frame with the current snapshot
+                await communicator.receive_json_from(timeout=2)
+            frames = [
+                await communicator.receive_json_from(timeout=2)
+                for communicator in communicators
+            ]
+            for communicator in communicators:
+                await communicator.disconnect()
+            return frames
+
+        with patch.object(metrics_broadcaster, "produce", produce):
+            frames = asyncio.run(run())
+
+        for frame in frames:
+            self.assertEqual(frame, {"type": "metrics_update", "data": self.broadcast})
+        # One sample per tick, not one per connection
+        self.assertLess(produce.await_count, len(frames))
+        self.assertIsNone(metrics_broadcaster._task)
+        self.assertIsNone(cache.get(metrics_broadcaster.lease_key))
+
+    def test_paused_broadcaster_does_not_produce(self):
+        broadcaster = GroupBroadcaster("metrics", "metrics.update", None, "unused")
+        broadcaster.paused = True
+
+        async def run():
+            await broadcaster.subscribe()
+            self.assertIsNone(broadcaster._task)
+            await broadcaster.unsubscribe()
+
+        asyncio.run(run())
+
+    def test_only_the_lease_holder_produces(self):
+        leader = GroupBroadcaster("metrics", "metrics.update", None, "unused")
+        follower = GroupBroadcaster("metrics", "metrics.update", None, "unused")
+
+        async def run():
+            return [
+                await leader._hold_lease(1),
+                await follower._hold_lease(1),
+                await leader._hold_lease(1),
+            ]
+
+        self.assertEqual(asyncio.run(run()), [True, False, True])
+        asyncio.run(leader._release_lease())
+        self.assertTrue(asyncio.run(follower._hold_lease(1)))
+        asyncio.run(follower._release_lease())
+
+
+class ConsumerMetricsTest(SimpleTestCase):
+    """Consumers export connection, send and delivery metrics"""
+
+    def sample(self, name):
+        return REGISTRY.get_sample_value(name, {"route": "metrics"}) or 0
+
+    def test_connection_lifecycle_and_sends_are_recorded(self):
+        metrics = {"cpu_percent": 1.0}
+        before = {
+            name: self.sample(name)
+            for name in (
+                "websocket_connections",
+                "websocket_connects_total",
+                "websocket_disconnects_total",
+                "websocket_send_duration_seconds_count",
+                "websocket_sent_bytes_total",
+            )
+        }
+
+        async def run():
+            communicator = WebsocketCommunicator(
+                MetricsConsumer.as_asgi(), "/ws/metrics/"
+            )
+            await communicator.connect()
+            frame = await communicator.receive_output(timeout=2)
+            open_connections = self.sample("websocket_connections")
+            await communicator.disconnect()
+            return frame, open_connections
+
+        with patch.object(
+            MetricsConsumer, "get_metrics_data", AsyncMock(return_value=metrics)
+        ), patch.object(metrics_broadcaster, "subscribe", AsyncMock()), patch.object(
+            metrics_broadcaster, "unsubscribe", AsyncMock()
+        ):
+            frame, open_connections = asyncio.run(run())
+
+        self.assertEqual(open_connections, before["websocket_connections"] + 1)
+        self.assertEqual(
+            self.sample("websocket_connections"), before["websocket_connections"]
+        )
+        for name in ("websocket_connects_total", "websocket_disconnects_total"):
+            self.assertEqual(self.sample(name), before[name] + 1)
+        self.assertEqual(
+            self.sample("websocket_send_duration_seconds_count"),
+            before["websocket_send_duration_seconds_count"] + 1,
+        )
+        self.assertEqual(
+            self.sample("websocket_sent_bytes_total"),
+            before["websocket_sent_bytes_total"] + len(frame["text"]),
+        )
+
+    def test_broadcast_delivery_lag_is_recorded(self):
+        lag_count = self.sample("websocket_delivery_lag_seconds_count")
+        lag_sum = self.sample("websocket_delivery_lag_seconds_sum")
+        depth_count = self.sample("websocket_queue_depth_count")
+
+        async def run():
+            communicator = WebsocketCommunicator(
+                MetricsConsumer.as_asgi(), "/ws/metrics/"
+            )
+            await communicator.connect()
+            await communicator.receive_output(timeout=2)
+            await get_channel_layer().group_send(
+                "metrics",
+                {"type": "metrics.update", "data": {}, "sent_at": time.time() - 1},
+            )
+            frame = await communicator.receive_json_from(timeout=2)
+            await communicator.disconnect()
+            return frame
+
+        with patch.object(
+            MetricsConsumer, "get_metrics_data", AsyncMock(return_value={})
+        ), patch.object(metrics_broadcaster, "subscribe", AsyncMock()), patch.object(
+            metrics_broadcaster, "unsubscribe", AsyncMock()
+        ):
+            frame = asyncio.run(run())
+
+        self.assertEqual(frame, {"type": "metrics_update", "data": {}})
+        self.assertEqual(
+            self.sample("websocket_delivery_lag_seconds_count"), lag_count + 1
+        )
+        self.assertGreaterEqual(
+            self.sample("websocket_delivery_lag_seconds_sum"), lag_sum + 1
+        )
+        self.assertEqual(self.sample("websocket_queue_depth_count"), depth_count + 1)
@@ -0,0 +1,220 @@
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from prometheus_client import REGISTRY
+
+from api.cache import RELEASE_LOCK_SCRIPT, LocalLRU, TwoTierCache
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class FakeRedis:
+    """The redis-py calls of RedisCache and the fetch lock, in memory"""
+
+    def __init__(self):
+        self.data = {}
+        self.locks = {}
+        self.scripts = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, **options):
+        if nx and key in self.data:
+            return False
+        if isinstance(value, str):
+            value = value.encode()
+        if key.endswith(":lock"):
+            self.locks[key] = (value.decode(), {"nx": nx, **options})
+        self.data[key] = value
+        return True
+
+    def eval(self, script, numkeys, key, token):
+        # What RELEASE_LOCK_SCRIPT does on a real server
+        self.scripts.append((script, key, token))
+        if self.data.get(key) == token.encode():
+            del self.data[key]
+            return 1
+        return 0
+
+
+class LocalLRUTest(SimpleTestCase):
+    def test_evicts_least_recently_used_beyond_max_entries(self):
+        lru = LocalLRU(max_entries=2, max_bytes=10_000)
+        lru.set("a", 1, 60)
+        lru.set("b", 2, 60)
+        lru.get("a")
+        evictions = sample("cache_evictions_total")
+        lru.set("c", 3, 60)
+        self.assertEqual(lru.get("a"), 1)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(sample("cache_evictions_total"), evictions + 1)
+
+    def test_evicts_beyond_max_bytes(self):
+        lru = LocalLRU(max_entries=100, max_bytes=300)
+        lru.set("a", b"x" * 200, 60)
+        lru.set("b", b"y" * 200, 60)
+        self.assertIsNone(lru.get("a"))
+        self.assertEqual(len(lru), 1)
+
+    def test_entries_expire(self):
+        lru = LocalLRU(max_entries=10, max_bytes=10_000)
+        lru.set("a", 1, 5)
+        with mock.patch("api.cache.time.monotonic", return_value=time.monotonic() + 6):
+            self.assertIsNone(lru.get("a"))
+
+    def test_returns_copies(self):
+        lru = LocalLRU(max_entries=10, max_bytes=10_000)
+        lru.set("a", [1], 60)
+        lru.get("a").append(2)
+        self.assertEqual(lru.get("a"), [1])
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        # A fresh LOCATION gives each test its own in-process tier
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return TwoTierCache(
+            f"test-{uuid.uuid4()}",
+            {"TIMEOUT": 60, "OPTIONS": {"REMOTE": "default", **options}},
+        )
+
+    def test_remote_hit_populates_local_tier(self):
+        self.cache.set("key", "value")
+        other_process = self.make_cache()
+        remote_hits = sample("cache_hits_total", tier="remote")
+        local_hits = sample("cache_hits_total", tier="local")
+        self.assertEqual(other_process.get("key"), "value")
+        self.assertEqual(other_process.get("key"), "value")
+        self.assertEqual(sample("cache_hits_total", tier="remote"), remote_hits + 1)
+        self.assertEqual(sample("cache_hits_total", tier="local"), local_hits + 1)
+
+    def test_miss_is_counted(self):
+        misses = sample("cache_misses_total")
+        self.assertEqual(self.cache.get("missing", "default"), "default")
+        self.assertEqual(sample("cache_misses_total"), misses + 1)
+
+    def test_delete_clears_both_tiers(self):
+        self.cache.set("key", "value")
+        self.cache.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+        self.assertIsNone(caches["default"].get("key"))
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.cache.add("counter", 1))
+        self.assertFalse(self.cache.add("counter", 5))
+        self.assertEqual(self.cache.incr("counter"), 2)
+
+    def test_fetch_caches_computed_value(self):
+        compute = mock.Mock(return_value="fresh")
+        self.assertEqual(self.cache.fetch("key", compute), "fresh")
+        self.assertEqual(self.cache.fetch("key", compute), "fresh")
+        compute.assert_called_once_with()
+
+    def test_fetch_does_not_cache_none(self):
+        compute = mock.Mock(return_value=None)
+        self.assertIsNone(self.cache.fetch("key", compute))
+        self.assertIsNone(self.cache.fetch("key", compute))
+        self.assertEqual(compute.call_count, 2)
+
+    def test_fetch_is_single_flight(self):
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return "fresh"
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(self.cache.fetch("k", compute))
+        )
+        leader.start()
+        started.wait()
+        follower = self.make_cache(LOCK_POLL_INTERVAL=0.01)
+        results.append(follower.fetch("k", compute))
+        leader.join()
+        self.assertEqual(results, ["fresh", "fresh"])
+        self.assertEqual(len(calls), 1)
+
+    def test_fetch_keeps_a_lock_taken_over_after_it_expired(self):
+        def compute():
+            # The lock expired mid-recompute and another caller took it
+            caches["default"].set("k:lock", "other", 60)
+            return "value"
+
+        self.assertEqual(self.cache.fetch("k", compute), "value")
+        self.assertEqual(caches["default"].get("k:lock"), "other")
+
+    def test_fetch_releases_its_own_lock(self):
+        self.assertEqual(self.cache.fetch("k", lambda: "value"), "value")
+        self.assertFalse(caches["default"].has_key("k:lock"))
+
+    def redis_cache(self, client):
+        """A TwoTierCache over a RedisCache whose redis-py client is `client`"""
+        redis_caches = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "redis": {"BACKEND": "django.core.cache.backends.redis.RedisCache"},
+        }
+        stack = ExitStack()
+        stack.enter_context(override_settings(CACHES=redis_caches))
+        # Fails loudly if Django drops the private accessor the lock relies on
+        stack.enter_context(
+            mock.patch(
+                "django.core.cache.backends.redis.RedisCacheClient.get_client",
+                return_value=client,
+            )
+        )
+        self.addCleanup(stack.close)
+        return self.make_cache(REMOTE="redis", LOCK_TIMEOUT=2)
+
+    def test_fetch_locks_redis_with_a_token(self):
+        client = FakeRedis()
+        cache = self.redis_cache(client)
+        self.assertEqual(cache.fetch("k", lambda: "value"), "value")
+
+        key = caches["redis"].make_key("k:lock")
+        token, options = client.locks[key]
+        self.assertEqual(options, {"nx": True, "px": 2000})
+        self.assertEqual(client.scripts, [(RELEASE_LOCK_SCRIPT, key, token)])
+        self.assertNotIn(key, client.data)
+
+    def test_fetch_keeps_a_redis_lock_taken_over_after_it_expired(self):
+        client = FakeRedis()
+        cache = self.redis_cache(client)
+        key = caches["redis"].make_key("k:lock")
+
+        def compute():
+            client.data[key] = b"other"
+            return "value"
+
+        self.assertEqual(cache.fetch("k", compute), "value")
+        self.assertEqual(client.data[key], b"other")
+
+    def test_fetch_refreshes_early_near_expiry(self):
+        self.cache.fetch("key", lambda: "old", timeout=60)
+        # Pretend computing took long enough that refreshing now is certain
+        envelope = caches["default"].get("key")
+        caches["default"].set("key", (envelope[0], 1000.0, envelope[2]))
+        refreshes = sample("cache_early_refreshes_total")
+        fresh_cache = self.make_cache()
+        with mock.patch("api.cache.random.random", return_value=0.5):
+            value = fresh_cache.fetch("key", lambda: "new", timeout=60)
+        self.assertEqual(value, "new")
+        self.assertEqual(sample("cache_early_refreshes_total"), refreshes + 1)
+
+    def test_fetch_keeps_entries_far_from_expiry(self):
+        self.cache.fetch("key", lambda: "old", timeout=60)
+        self.assertEqual(self.cache.fetch("key", lambda: "new", timeout=60), "old")
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import (
+    ValuesSerializer,
+    fast_comment_serializer,
+    fast_post_list_serializer,
+    fast_user_serializer,
+)
+from api.models import Comment, Post
+from api.serializers import (
+    CommentSerializer,
+    PostListSerializer,
+    PostSerializer,
+    UserSerializer,
+)
+
+
+class ValuesSerializerEquivalenceTest(TestCase):
+    """The fast path must render byte-for-byte what the DRF serializers render"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create(
+                username="fast",
+                email="fast@example.com",
+                first_name="Fäst",
+                last_name="Pāth",
+            ),
+            User.objects.create(username="blank"),
+        ]
+        for i in range(4):
+            post = Post.objects.create(
+                title=f'Post "{i}" <b>',
+                content="Content",
+                author=self.users[i % 2],
+                published=i % 2 == 0,
+            )
+            Comment.objects.create(content="Nice", post=post, author=self.users[1])
+
+    def assertRendersIdentically(self, serializer_class, fast, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        rows = queryset.values(*fast.values_fields)
+        self.assertEqual(JSONRenderer().render(fast.serialize(rows)), expected)
+
+    def test_post_list_serializer(self):
+        self.assertRendersIdentically(
+            PostListSerializer,
+            fast_post_list_serializer,
+            Post.objects.select_related("author"),
+        )
+
+    def test_comment_serializer(self):
+        self.assertRendersIdentically(
+            CommentSerializer,
+            fast_comment_serializer,
+            Comment.objects.select_related("author"),
+        )
+
+    def test_user_serializer(self):
+        self.assertRendersIdentically(
+            UserSerializer, fast_user_serializer, User.objects.order_by("id")
+        )
+
+    def test_values_fields_skip_write_only_fields(self):
+        self.assertNotIn("author_id", fast_comment_serializer.values_fields)
+        self.assertIn("author__username", fast_comment_serializer.values_fields)
+
+    def test_method_fields_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(PostSerializer).compile()
+
+
+class ValuesListEndpointTest(TestCase):
+    def test_posts_list_matches_serializer_output(self):
+        user = User.objects.create(username="lister", email="l@example.com")
+        Post.objects.create(title="Listed", content="Content", author=user)
+
+        response = self.client.get("/api/v1/posts/")
+        expected = PostListSerializer(
+            Post.objects.select_related("author"), many=True
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(response.json()["results"]),
+            JSONRenderer().render(expected),
+        )
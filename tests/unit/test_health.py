@@ -0,0 +1,89 @@
+import asyncio
+import os
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, override_settings
+
+from api.consumers import StatusConsumer, status_broadcaster
+from api.health import HealthProber, get_status_data
+
+
+class HealthProberTest(TestCase):
+    def setUp(self):
+        self.prober = HealthProber()
+        self.addCleanup(self.prober.stop)
+
+    def test_inline_checks_report_connected(self):
+        snapshot = self.prober.snapshot()
+        self.assertEqual(snapshot["database"], "Connected")
+        self.assertEqual(snapshot["channel_layer"], "Connected")
+
+    @patch("django.db.connection.cursor", side_effect=Exception("DB down"))
+    def test_failed_check_is_reported(self, _):
+        self.assertEqual(self.prober.snapshot()["database"], "Error: DB down")
+
+    @override_settings(HEALTH_CHECK_INTERVAL=60)
+    def test_status_reads_do_not_query_the_database(self):
+        self.prober._snapshot = {
+            "database": "Connected",
+            "channel_layer": "Connected",
+            "checked_at": time.time() - 3,
+        }
+        # Pretend this process's prober thread is already running
+        self.prober._pid = os.getpid()
+        with patch("api.health.health_prober", self.prober):
+            with self.assertNumQueries(0):
+                data = get_status_data()
+        self.assertEqual(data["database"], "Connected")
+        self.assertGreaterEqual(data["check_age_seconds"], 3)
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05)
+    def test_slow_checks_time_out_in_the_background(self):
+        release = threading.Event()
+        self.prober.on_start()
+        self.addCleanup(release.set)
+        with patch.object(
+            HealthProber, "check_database", lambda prober: release.wait(5)
+        ):
+            snapshot = self.prober.background_sample()
+        self.assertEqual(snapshot["database"], "Error: timed out after 0.05s")
+        self.assertEqual(snapshot["channel_layer"], "Connected")
+
+    def test_channel_probe_leaves_the_consumers_layer_alone(self):
+        layer = get_channel_layer()
+        receive = layer.receive
+        loops = set()
+
+        async def receive_on_one_loop(channel):
+            # What RedisChannelLayer enforces for concurrent receives
+            loops.add(asyncio.get_running_loop())
+            if len(loops) > 1:
+                raise RuntimeError("Two event loops are trying to receive()")
+            return await receive(channel)
+
+        async def run():
+            communicator = WebsocketCommunicator(
+                StatusConsumer.as_asgi(), "/ws/status/"
+            )
+            await communicator.connect()
+            await communicator.receive_output(timeout=2)
+            # The consumer is waiting in receive() while the probe runs
+            result = await asyncio.to_thread(self.prober.check_channel_layer)
+            await layer.group_send("status", {"type": "status.update", "data": {}})
+            frame = await communicator.receive_json_from(timeout=2)
+            await communicator.disconnect()
+            return result, frame
+
+        with patch.object(layer, "receive", receive_on_one_loop), patch.object(
+            StatusConsumer, "get_status_data", AsyncMock(return_value={})
+        ), patch.object(status_broadcaster, "subscribe", AsyncMock()), patch.object(
+            status_broadcaster, "unsubscribe", AsyncMock()
+        ):
+            result, frame = asyncio.run(run())
+
+        self.assertEqual(result, "Connected")
+        self.assertEqual(frame, {"type": "status_update", "data": {}})
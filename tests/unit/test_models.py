@@ -1,8 +1,12 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import User
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from api.models import Comment, Post
+from api.models import Comment, Post, TableVersion
 
 
 class PostModelTest(TestCase):
@@ -97,3 +101,120 @@ class CommentModelTest(TestCase):
         comments = Comment.objects.all()
         self.assertEqual(comments[0], comment2)
         self.assertEqual(comments[1], comment1)
+
+
+class PostCommentsCountTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(username="counter", email="c@example.com")
+            self.post = Post.objects.create(
+                title="Counted Post", content="Content", author=self.user
+            )
+
+    def test_comments_count_defaults_to_zero(self):
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_comment_creation_increments_count(self):
+        Comment.objects.create(content="One", post=self.post, author=self.user)
+        Comment.objects.create(content="Two", post=self.post, author=self.user)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+
+    def test_comment_deletion_decrements_count(self):
+        comment = Comment.objects.create(
+            content="One", post=self.post, author=self.user
+        )
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_cascaded_deletion_decrements_count(self):
+        commenter = User.objects.create(username="commenter")
+        Comment.objects.create(content="Mine", post=self.post, author=self.user)
+        Comment.objects.create(content="Theirs", post=self.post, author=commenter)
+        commenter.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_deleting_a_post_skips_the_counter_of_its_comments(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                Comment.objects.create(
+                    content=f"C{i}", post=self.post, author=self.user
+                )
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                self.post.delete()
+        self.assertFalse(
+            [q["sql"] for q in queries if q["sql"].startswith('UPDATE "api_post"')]
+        )
+        # One version bump for the transaction, not one per deleted row
+        self.assertEqual(len(callbacks), 1)
+        versions = TableVersion.get_versions(Post, Comment)
+        self.assertTrue(all(version for version, _ in versions.values()))
+
+    def test_writes_after_a_rolled_back_savepoint_still_bump_versions(self):
+        before = TableVersion.get_versions(Comment)["api.comment"][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Post.objects.create(title="Gone", content="C", author=self.user)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            Comment.objects.create(content="Kept", post=self.post, author=self.user)
+        self.assertEqual(
+            TableVersion.get_versions(Comment)["api.comment"][0], before + 1
+        )
+
+    def test_moving_comment_updates_both_posts(self):
+        other_post = Post.objects.create(
+            title="Other Post", content="Content", author=self.user
+        )
+        comment = Comment.objects.create(
+            content="One", post=self.post, author=self.user
+        )
+        comment.post = other_post
+        comment.save()
+        self.post.refresh_from_db()
+        other_post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(other_post.comments_count, 1)
+
+    def test_saving_a_stale_post_keeps_newer_comments_count(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(content="One", post=self.post, author=self.user)
+        stale.title = "Renamed"
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, "Renamed")
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_reconcile_comments_count(self):
+        Comment.objects.create(content="One", post=self.post, author=self.user)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=42)
+        Post.objects.reconcile_comments_count()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+
+class TableVersionTest(TestCase):
+    def test_bump_creates_and_increments_in_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            TableVersion.bump("test.first", "test.second", "test.first")
+        self.assertEqual(len(queries), 1)
+        TableVersion.bump("test.first")
+
+        versions = TableVersion.get_versions("test.first", "test.second", "test.none")
+        self.assertEqual(
+            {label: version for label, (version, _) in versions.items()},
+            {"test.first": 2, "test.second": 1, "test.none": 0},
+        )
+        self.assertIsNotNone(versions["test.first"][1])
+
+    def test_bump_moves_updated_at_forward(self):
+        TableVersion.bump("test.table")
+        TableVersion.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        TableVersion.bump("test.table")
+        updated_at = TableVersion.get_versions("test.table")["test.table"][1]
+        self.assertGreater(updated_at, timezone.now() - timedelta(minutes=1))
@@ -0,0 +1,102 @@
+import datetime
+import decimal
+import io
+import json
+import uuid
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import (
+    FastJSONParser,
+    FastJSONRenderer,
+    FastJsonResponse,
+    MessagePackParser,
+    MessagePackRenderer,
+)
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def setUp(self):
+        self.renderer = FastJSONRenderer()
+
+    def assertMatchesDRF(self, data):
+        self.assertEqual(self.renderer.render(data), JSONRenderer().render(data))
+
+    def test_plain_structures_match_drf(self):
+        self.assertMatchesDRF(
+            {"id": 1, "title": "Ünïcode ✓", "tags": ["a", "b"], "ok": True, "x": None}
+        )
+
+    def test_datetimes_match_drf(self):
+        self.assertMatchesDRF(
+            {
+                "aware": datetime.datetime(
+                    2025, 1, 1, 10, 0, 0, 123456, tzinfo=datetime.timezone.utc
+                ),
+                "naive": datetime.datetime(2025, 1, 1, 10, 0, 0),
+                "date": datetime.date(2025, 1, 1),
+                "time": datetime.time(10, 30),
+            }
+        )
+
+    def test_decimal_uuid_and_lazy_strings_match_drf(self):
+        self.assertMatchesDRF(
+            {
+                "price": decimal.Decimal("9.99"),
+                "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                "label": gettext_lazy("Lazy"),
+            }
+        )
+
+    def test_line_separators_are_escaped(self):
+        self.assertMatchesDRF({"text": "a\u2028b\u2029c"})
+
+    def test_indent_falls_back_to_stdlib(self):
+        data = {"a": [1, 2]}
+        self.assertEqual(
+            self.renderer.render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(self.renderer.render(None), b"")
+
+
+class FastJSONParserTest(SimpleTestCase):
+    def test_parses_utf8_body(self):
+        stream = io.BytesIO('{"title": "Ünïcode", "n": 1}'.encode())
+        self.assertEqual(FastJSONParser().parse(stream), {"title": "Ünïcode", "n": 1})
+
+    def test_invalid_body_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{not json"))
+
+
+class FastJsonResponseTest(SimpleTestCase):
+    def test_response_is_compact_json(self):
+        response = FastJsonResponse({"status": "healthy"}, status=200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, b'{"status":"healthy"}')
+
+
+class MessagePackRendererTest(SimpleTestCase):
+    def test_round_trip_matches_json_representation(self):
+        data = {
+            "id": 1,
+            "title": "Ünïcode",
+            "created_at": datetime.datetime(
+                2025, 1, 1, 10, 0, 0, 123456, tzinfo=datetime.timezone.utc
+            ),
+            "price": decimal.Decimal("9.99"),
+            "tags": ["a", None],
+        }
+        packed = MessagePackRenderer().render(data)
+        unpacked = MessagePackParser().parse(io.BytesIO(packed))
+        self.assertEqual(unpacked, json.loads(JSONRenderer().render(data)))
+
+    def test_invalid_body_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b"\xc1"))
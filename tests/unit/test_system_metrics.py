@@ -0,0 +1,44 @@
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from api.system_metrics import SystemMetricsSampler
+
+
+class SystemMetricsSamplerTest(SimpleTestCase):
+    def setUp(self):
+        self.sampler = SystemMetricsSampler()
+        self.addCleanup(self.sampler.stop)
+
+    @patch("psutil.cpu_percent", return_value=25.5)
+    @patch("psutil.virtual_memory")
+    @patch("psutil.disk_usage")
+    def test_inline_sampling_when_interval_is_zero(self, mock_disk, mock_memory, _):
+        mock_memory.return_value.percent = 45.2
+        mock_disk.return_value.percent = 60.8
+        snapshot = self.sampler.snapshot()
+        self.assertEqual(snapshot["cpu_percent"], 25.5)
+        self.assertEqual(snapshot["memory_percent"], 45.2)
+        self.assertEqual(snapshot["disk_percent"], 60.8)
+
+    @patch("psutil.cpu_percent", side_effect=Exception("CPU error"))
+    def test_sampling_errors_are_reported_in_the_snapshot(self, _):
+        self.assertEqual(self.sampler.snapshot()["error"], "CPU error")
+
+    @override_settings(SYSTEM_METRICS_INTERVAL=0.01)
+    def test_background_thread_refreshes_the_snapshot(self):
+        self.sampler.snapshot()
+        deadline = time.monotonic() + 2
+        while self.sampler._snapshot is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIn("cpu_percent", self.sampler._snapshot)
+
+    @override_settings(SYSTEM_METRICS_INTERVAL=60)
+    def test_reads_return_the_snapshot_without_calling_psutil(self):
+        self.sampler.snapshot()
+        self.sampler._snapshot = {"cpu_percent": 1.0, "sampled_at": 0}
+        with patch("psutil.cpu_percent") as mock_cpu:
+            snapshot = self.sampler.snapshot()
+        mock_cpu.assert_not_called()
+        self.assertEqual(snapshot["cpu_percent"], 1.0)